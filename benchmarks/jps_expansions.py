@@ -0,0 +1,40 @@
+# Compares nodes expanded by dijkstra, astar and jump_point_search on the open
+# floor grids generate_game_grid produces with low obstacle probability.
+# Run from the repository root: python benchmarks/jps_expansions.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from warehouse_nav.pathfinder import DijkstraPathfinder, find_start_end
+from warehouseminigameREAL import generate_game_grid
+
+
+def run(size, obstacle_prob, slow_prob, seed=0):
+    random.seed(seed)
+    grid = generate_game_grid(size, size, obstacle_prob, slow_prob)
+    start, dest = find_start_end(grid)
+    pathfinder = DijkstraPathfinder(grid)
+    row = [size, obstacle_prob, slow_prob]
+    costs = set()
+    for name, search in [('dijkstra', pathfinder.dijkstra),
+                         ('astar', pathfinder.astar),
+                         ('jps', pathfinder.jump_point_search)]:
+        t = time.perf_counter()
+        cost, _ = search(start, dest)
+        row += [pathfinder.nodes_expanded, time.perf_counter() - t]
+        costs.add(cost)
+    # every mode has to agree on the optimal cost
+    row.append('ok' if len(costs) == 1 else f'MISMATCH {costs}')
+    return row
+
+
+if __name__ == "__main__":
+    print(f"{'size':>5} {'obst':>5} {'slow':>5} | {'dijkstra':>16} | {'astar':>16} | {'jps':>16} | cost")
+    for size in (50, 100, 200):
+        for obstacle_prob in (0.0, 0.05, 0.1):
+            for slow_prob in (0.0, 0.02):
+                size_, obst, slow, de, dt, ae, at, je, jt, ok = run(size, obstacle_prob, slow_prob)
+                print(f"{size_:>5} {obst:>5} {slow:>5} | {de:>7} {dt:>7.3f}s | {ae:>7} {at:>7.3f}s | {je:>7} {jt:>7.3f}s | {ok}")
@@ -0,0 +1,298 @@
+# Benchmark suite for every search mode on seeded synthetic warehouses.
+#
+# Each layout is generated from a seed, every mode answers the same fixed set
+# of queries, and the results (wall time, nodes expanded, peak traced memory
+# and whether the cost matches the reference dijkstra) are written as JSON
+# and/or CSV. The reference dijkstra only runs on maps up to --reference-limit
+# cells; above that costs are not checked. Pass an earlier JSON run as
+# --baseline to get a comparison and a non-zero exit status when something got
+# slower, expanded more or stopped matching the reference.
+#
+# Run from the repository root, e.g.
+#   python benchmarks/suite.py --sizes 10 50 200 --json base.json
+#   python benchmarks/suite.py --sizes 10 50 200 --baseline base.json
+#   python benchmarks/suite.py --sizes 4000 --modes csr astar hpa --no-memory
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from warehouse_nav.hierarchical_planner import HierarchicalPlanner
+from warehouse_nav.incremental_planner import DStarLite
+from warehouse_nav.pathfinder import DijkstraPathfinder
+from warehouse_nav.warehouse_grid import CELL_TYPES, WarehouseGrid
+from main import warehouse_map as MAIN_MAP
+from warehouseminigameREAL import generate_game_grid
+
+FLOOR, WALL, PRIORITY = CELL_TYPES.index('.'), CELL_TYPES.index('X'), CELL_TYPES.index('P')
+
+# mode -> largest rows * cols it is run on; the slow engines would take hours
+# on the big maps
+MODES = {
+    'dijkstra': None,
+    'scan': 100 * 100,
+    'csr': None,
+    'astar': None,
+    'bidirectional': None,
+    'bidirectional_astar': None,
+    'jps': None,
+    'hpa': None,
+    'dstar_lite': 500 * 500,
+}
+LAYOUTS = ['main', 'game', 'aisles', 'random']
+# largest rows * cols the reference dijkstra runs on; on a 4000x4000 map it
+# would take longer than every mode together
+REFERENCE_LIMIT = 500 * 500
+# slower than baseline * (1 + TIME_TOLERANCE) counts as a regression
+TIME_TOLERANCE = 0.25
+
+
+def game_layout(size, seed):
+    # generate_game_grid as the minigame uses it, on a seeded random module
+    random.seed(seed)
+    return WarehouseGrid.from_chars(generate_game_grid(size, size, 0.2, 0.1))
+
+
+def aisle_layout(size, seed):
+    # rack rows two cells deep with one-cell aisles between them, a cross aisle
+    # every 20 columns, priority lanes along some aisles and a few pallets
+    # left in the aisles
+    rng = np.random.default_rng(seed)
+    codes = np.full((size, size), FLOOR, dtype=np.uint8)
+    racks = (np.arange(size) % 3 != 0)[:, None] & (np.arange(size) % 20 >= 2)[None, :]
+    codes[racks] = WALL
+    lanes = (np.arange(size) % 3 == 0) & (rng.random(size) < 0.3)
+    codes[lanes, :] = np.where(codes[lanes, :] == FLOOR, PRIORITY, codes[lanes, :])
+    codes[(codes == FLOOR) & (rng.random((size, size)) < 0.02)] = WALL
+    return WarehouseGrid(codes)
+
+
+def random_layout(size, seed, obstacle_prob=0.25, slow_prob=0.1):
+    rng = np.random.default_rng(seed)
+    draw = rng.random((size, size))
+    codes = np.full((size, size), FLOOR, dtype=np.uint8)
+    codes[draw < obstacle_prob + slow_prob] = PRIORITY
+    codes[draw < obstacle_prob] = WALL
+    return WarehouseGrid(codes)
+
+
+def make_layout(layout, size, seed):
+    if layout == 'main':
+        return WarehouseGrid.from_chars(MAIN_MAP)
+    if layout == 'game':
+        return game_layout(size, seed)
+    if layout == 'aisles':
+        return aisle_layout(size, seed)
+    if layout == 'random':
+        return random_layout(size, seed)
+    raise ValueError(f"Unknown layout: {layout!r}")
+
+
+def make_queries(grid, count, seed):
+    # fixed (start, destination) pairs between open cells, same for every mode
+    rng = np.random.default_rng(seed)
+    open_cells = np.flatnonzero(grid.passable)
+    if open_cells.size < 2:
+        return []
+    picks = rng.choice(open_cells, size=(count, 2))
+    return [(divmod(int(a), grid.cols), divmod(int(b), grid.cols)) for a, b in picks]
+
+
+def make_runner(mode, grid):
+    # query(start, destination) -> (cost, nodes expanded)
+    if mode == 'hpa':
+        planner = HierarchicalPlanner(grid)
+
+        def query(start, destination):
+            cost, _ = planner.route(start, destination)
+            return cost, planner.nodes_expanded
+        return query
+
+    if mode == 'dstar_lite':
+        def query(start, destination):
+            planner = DStarLite(grid, start, destination)
+            cost, _ = planner.plan()
+            return cost, planner.nodes_expanded
+        return query
+
+    pathfinder = DijkstraPathfinder(grid)
+    search = {
+        'dijkstra': pathfinder.dijkstra,
+        'scan': lambda s, d: pathfinder.dijkstra(s, d, engine='scan'),
+        'csr': lambda s, d: pathfinder.dijkstra(s, d, engine='csr'),
+        'astar': pathfinder.astar,
+        'bidirectional': pathfinder.bidirectional,
+        'bidirectional_astar': lambda s, d: pathfinder.bidirectional(s, d, astar=True),
+        'jps': pathfinder.jump_point_search,
+    }[mode]
+
+    def query(start, destination):
+        cost, _ = search(start, destination)
+        return cost, pathfinder.nodes_expanded
+    return query
+
+
+def run_mode(mode, grid, queries, reference, measure_memory=True):
+    # reference=None skips the cost check; cost_matches is then None
+    t = time.perf_counter()
+    query = make_runner(mode, grid)
+    setup = time.perf_counter() - t
+
+    expanded = 0
+    matches = 0
+    worst_ratio = 1.0
+    t = time.perf_counter()
+    for i, (start, destination) in enumerate(queries):
+        cost, nodes = query(start, destination)
+        expanded += nodes
+        if reference is None:
+            continue
+        expected = reference[i]
+        if cost == expected:
+            matches += 1
+        elif expected not in (0, float('inf')):
+            worst_ratio = max(worst_ratio, cost / expected)
+    seconds = time.perf_counter() - t
+
+    peak = None
+    if measure_memory:
+        # a second pass under tracemalloc, so tracing does not skew the timing
+        tracemalloc.start()
+        query = make_runner(mode, grid)
+        for start, destination in queries:
+            query(start, destination)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'mode': mode,
+        'setup_seconds': round(setup, 6),
+        'seconds': round(seconds, 6),
+        'ms_per_query': round(1000 * seconds / max(len(queries), 1), 3),
+        'nodes_expanded': expanded,
+        'peak_bytes': peak,
+        'cost_matches': None if reference is None else matches,
+        'queries': len(queries),
+        # HPA* with sparse entrances is allowed to be near-optimal
+        'worst_cost_ratio': None if reference is None else round(worst_ratio, 6),
+    }
+
+
+def run_suite(sizes, layouts, modes, queries_per_map=5, seed=0, measure_memory=True, log=print,
+              reference_limit=REFERENCE_LIMIT):
+    records = []
+    for layout in layouts:
+        for size in ([5] if layout == 'main' else sizes):
+            grid = make_layout(layout, size, seed)
+            queries = make_queries(grid, queries_per_map, seed)
+            reference = None
+            if grid.rows * grid.cols <= reference_limit:
+                reference_finder = DijkstraPathfinder(grid)
+                reference = [reference_finder.dijkstra(s, d)[0] for s, d in queries]
+            for mode in modes:
+                limit = MODES[mode]
+                if limit is not None and grid.rows * grid.cols > limit:
+                    continue
+                record = {'layout': layout, 'rows': grid.rows, 'cols': grid.cols, 'seed': seed}
+                record.update(run_mode(mode, grid, queries, reference, measure_memory))
+                records.append(record)
+                if log:
+                    log(format_record(record))
+    return records
+
+
+def format_record(record):
+    peak = record['peak_bytes']
+    peak = '-' if peak is None else f"{peak / 1024 / 1024:.1f}MB"
+    if record['cost_matches'] is None:
+        ok = '-'
+    elif record['cost_matches'] == record['queries']:
+        ok = 'ok'
+    else:
+        ok = f"x{record['worst_cost_ratio']}"
+    return (f"{record['layout']:>7} {record['rows']:>5}x{record['cols']:<5} {record['mode']:>20} "
+            f"{record['ms_per_query']:>10.3f}ms {record['nodes_expanded']:>10} {peak:>9} {ok}")
+
+
+def record_key(record):
+    return record['layout'], record['rows'], record['cols'], record['seed'], record['mode']
+
+
+def compare(records, baseline, tolerance=TIME_TOLERANCE):
+    # [(key, message), ...] for every record that regressed against baseline
+    old = {record_key(record): record for record in baseline}
+    regressions = []
+    for record in records:
+        before = old.get(record_key(record))
+        if before is None:
+            continue
+        key = record_key(record)
+        if None not in (record['cost_matches'], before['cost_matches']) and \
+                record['cost_matches'] < before['cost_matches']:
+            regressions.append((key, f"cost matches {before['cost_matches']} -> {record['cost_matches']}"))
+        if record['nodes_expanded'] > before['nodes_expanded']:
+            regressions.append((key, f"nodes expanded {before['nodes_expanded']} -> {record['nodes_expanded']}"))
+        if record['seconds'] > before['seconds'] * (1 + tolerance) and record['seconds'] > 0.01:
+            regressions.append((key, f"time {before['seconds']:.4f}s -> {record['seconds']:.4f}s"))
+    return regressions
+
+
+def write_csv(records, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(records[0]))
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every pathfinding mode on seeded warehouse layouts")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=LAYOUTS)
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--queries', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--json', help="write results to this JSON file")
+    parser.add_argument('--csv', help="write results to this CSV file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--reference-limit', type=int, default=REFERENCE_LIMIT,
+                        help="largest rows*cols to check costs against dijkstra on (0: never)")
+    args = parser.parse_args(argv)
+
+    print(f"{'layout':>7} {'size':^11} {'mode':>20} {'per query':>12} {'expanded':>10} {'peak':>9} cost")
+    records = run_suite(args.sizes, args.layouts, args.modes, args.queries, args.seed,
+                        measure_memory=not args.no_memory, reference_limit=args.reference_limit)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'records': records}, f, indent=1)
+    if args.csv and records:
+        write_csv(records, args.csv)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['records']
+        regressions = compare(records, baseline, args.tolerance)
+        for key, message in regressions:
+            print("REGRESSION", ' '.join(map(str, key)), message)
+        if not regressions:
+            print("no regressions against", args.baseline)
+        status = 1 if regressions else 0
+    if any(r['cost_matches'] is not None and r['cost_matches'] < r['queries'] and r['mode'] != 'hpa'
+           for r in records):
+        print("some modes disagree with dijkstra")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
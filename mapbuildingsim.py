@@ -1,92 +1,23 @@
+import sys
+import time
+
 import pygame
 import numpy as np
 
+from warehouse_nav.map_format import load_map, save_map
+from warehouse_nav.pathfinder import find_start_end
+from warehouse_nav.route_cache import RouteCache
+from warehouse_nav.warehouse_grid import WarehouseGrid
+
 
-class DijkstraPathfinder:
-    def __init__(self, grid):
-        self.grid = grid
-        self.rows = len(grid)
-        self.cols = len(grid[0])
-        self.directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        self.cost_map = {
-            '.': 1,
-            'P': 0.5,
-            'S': 0,
-            'D': 1
-        }
-
-    def get_cost(self, current, neighbor, direction):
-        r, c = neighbor
-        cell = self.grid[r][c]
-        move_cost = self.cost_map.get(cell, 1)
-        if direction in [(-1, 0), (0, -1)]:
-            move_cost = 0.5
-        return move_cost
-
-    def get_neighbors(self, r, c):
-        for dr, dc in self.directions:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < self.rows and 0 <= nc < self.cols and self.grid[nr][nc] != 'X':
-                yield (nr, nc), (dr, dc)
-
-    def dijkstra(self, start, destination):
-        unvisited = set((r, c) for r in range(self.rows) for c in range(self.cols) if self.grid[r][c] != 'X')
-        costs = {pos: float('inf') for pos in unvisited}                                                                 # Sets initial costs to infinity other than start
-        parents = {}
-        costs[start] = 0
-
-
-                                                                                                                        
-        while unvisited:                                                                                                 # Main loop
-            current = min(unvisited, key=lambda pos: costs[pos])                                                         # selects smallest cost
-            if current == destination:                                                                                   # exits loop on reaching destination
-                break
-
-            unvisited.remove(current)
-            r, c = current
-
-            for neighbor, direction in self.get_neighbors(r, c):                                                         # checks neighbors weights
-                if neighbor not in unvisited:
-                    continue
-                new_cost = costs[current] + self.get_cost(current, neighbor, direction)
-                if new_cost < costs[neighbor]:
-                    costs[neighbor] = new_cost
-                    parents[neighbor] = current
-
-        path = []                                                                                                        # Reconstructs the path using parent pointers
-        cur = destination
-        while cur in parents:
-            path.append(cur)
-            cur = parents[cur]
-        if cur == start:                                                                                                 # reverses the list
-            path.append(start)
-            path.reverse()
-            return costs[destination], path
-        else:       
-            return float('inf'), []                                                                                      # no path
-
-
-def find_start_end(grid):                                                                                                # finds start and end
-    start = end = None
-    for r in range(len(grid)):
-        for c in range(len(grid[0])):
-            if grid[r][c] == 'S':
-                start = (r, c)
-            elif grid[r][c] == 'D':
-                end = (r, c)
-    return start, end
-
-
-pygame.init()
 WIDTH, HEIGHT = 1000, 920
 ROWS, COLS = 10, 10
 GRID_OFFSET_X = 200  # Space for instructions
-CELL_SIZE = (WIDTH - GRID_OFFSET_X) // COLS
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Warehouse Editor + Pathfinding")
-
-font = pygame.font.SysFont("Arial", 18)
-
+VIEW_WIDTH, VIEW_HEIGHT = WIDTH - GRID_OFFSET_X, 800
+MIN_CELL_SIZE, MAX_CELL_SIZE = 2, 80
+CELL_SIZE = max(MIN_CELL_SIZE, min(VIEW_WIDTH // COLS, VIEW_HEIGHT // ROWS))
+# S saves the layout here and L loads it back (see map_format.py)
+MAP_FILE = "warehouse.map"
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -96,6 +27,7 @@ BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
 CYAN = (0, 255, 255)
 RED = (255, 0, 0)
+EXPANDED = (170, 210, 240)
 LEGEND_BG = (240, 240, 240)
 INSTRUCTION_BG = (230, 230, 230)
 
@@ -110,6 +42,8 @@ cell_types = {
 current_cell_type = 3  # Default to Start cell type
 
 warehouse = [['.' for _ in range(COLS)] for _ in range(ROWS)]
+# repeated SPACE presses on an unchanged grid are answered from here
+route_cache = RouteCache(WarehouseGrid.from_chars(warehouse))
 
 # Flags to track Start and Destination placement
 start_placed = False
@@ -118,9 +52,108 @@ end_placed = False
 # Log message to display
 log_message = ""
 
+# Rendering state. The visible part of the map is kept in view_surface and
+# only rebuilt on scroll/zoom/load; edits just repaint their own cell.
+scroll_r, scroll_c = 0, 0
+view_surface = None
+rebuild_view = True
+dirty_cells = set()
+reblit_view = False
+# last path found, drawn over the map until the next edit; the first
+# path_shown steps of it are on screen so far
+path_overlay = []
+path_shown = 0
+
+# SPACE runs the search a slice at a time so the window stays responsive:
+# search is the running search_steps() generator, search_overlay colors the
+# cells it has expanded or queued so far
+SEARCH_BUDGET = 0.008  # seconds of searching per frame
+search = None
+search_route = None
+search_overlay = {}
+
+def set_cell(r, c, cell):
+    global path_overlay, reblit_view, log_message
+    if warehouse[r][c] == cell:
+        return
+    warehouse[r][c] = cell
+    route_cache.set_cell(r, c, cell)
+    dirty_cells.add((r, c))
+    # an edit makes the search and the shown path stale
+    if cancel_search():
+        log_message = "Search cancelled by edit."
+    if path_overlay:
+        path_overlay = []
+        reblit_view = True
+
+def get_color_from_cell_type(cell_type):
+    if cell_type == 1:
+        return BLACK
+    elif cell_type == 2:
+        return YELLOW
+    elif cell_type == 3:
+        return BLUE
+    elif cell_type == 4:
+        return GREEN
+    else:
+        return WHITE
+
+# cell character -> color, and the same as an array indexed by grid code
+CELL_COLORS = {cell: get_color_from_cell_type(cell_type) for cell_type, cell in cell_types.items()}
+
+def code_colors(grid):
+    return np.array([CELL_COLORS.get(cell, WHITE) for cell in grid.cell_types], dtype=np.uint8)
+
+def visible_cells():
+    # (rows, cols) of the map that fit in the view at the current zoom
+    return (min(ROWS - scroll_r, -(-VIEW_HEIGHT // CELL_SIZE)),
+            min(COLS - scroll_c, -(-VIEW_WIDTH // CELL_SIZE)))
+
+def cell_rect(r, c):
+    # rect of cell (r, c) inside view_surface
+    return pygame.Rect((c - scroll_c) * CELL_SIZE, (r - scroll_r) * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+
+def cell_at(x, y):
+    # map cell under screen position (x, y), or None
+    if not (GRID_OFFSET_X <= x < WIDTH and y < VIEW_HEIGHT):
+        return None
+    r, c = scroll_r + y // CELL_SIZE, scroll_c + (x - GRID_OFFSET_X) // CELL_SIZE
+    return (r, c) if 0 <= r < ROWS and 0 <= c < COLS else None
+
+def build_view():
+    # whole view in one go: color lookup on the visible codes, scaled up
+    global view_surface
+    rows, cols = visible_cells()
+    grid = route_cache.grid
+    colors = code_colors(grid)[grid.codes[scroll_r:scroll_r + rows, scroll_c:scroll_c + cols]]
+    cells = pygame.surfarray.make_surface(colors.transpose(1, 0, 2))
+    view_surface = pygame.Surface((VIEW_WIDTH, VIEW_HEIGHT))
+    view_surface.fill(WHITE)
+    view_surface.blit(pygame.transform.scale(cells, (cols * CELL_SIZE, rows * CELL_SIZE)), (0, 0))
+    if CELL_SIZE >= 6:
+        for r in range(rows + 1):
+            pygame.draw.line(view_surface, GRAY, (0, r * CELL_SIZE), (cols * CELL_SIZE, r * CELL_SIZE))
+        for c in range(cols + 1):
+            pygame.draw.line(view_surface, GRAY, (c * CELL_SIZE, 0), (c * CELL_SIZE, rows * CELL_SIZE))
+    for r, c in search_overlay:
+        if is_visible(r, c):
+            draw_cell(r, c)
+
+def draw_cell(r, c):
+    rect = cell_rect(r, c)
+    cell = warehouse[r][c]
+    # a running search tints the plain floor it has reached
+    color = search_overlay.get((r, c), WHITE) if cell == '.' else CELL_COLORS.get(cell, WHITE)
+    pygame.draw.rect(view_surface, color, rect)
+    if CELL_SIZE >= 6:
+        pygame.draw.rect(view_surface, GRAY, rect.inflate(1, 1), 1)
+    return rect
+
+def is_visible(r, c):
+    rows, cols = visible_cells()
+    return scroll_r <= r < scroll_r + rows and scroll_c <= c < scroll_c + cols
+
 def draw_legend():
-    global current_cell_type
-    legend_font = pygame.font.SysFont("Arial", 16)
     legend = [
         ("Start", BLUE, 3),
         ("End", GREEN, 4),
@@ -140,11 +173,6 @@ def draw_legend():
         pygame.draw.rect(screen, BLACK, (x_offset, y_offset, 50, 50), 2)
         label = legend_font.render(text, True, BLACK)
         screen.blit(label, (x_offset - (label.get_width() // 2) + 25, y_offset + 55))
-        if pygame.mouse.get_pressed()[0]:
-            mx, my = pygame.mouse.get_pos()
-            if x_offset < mx < x_offset + 50 and y_offset < my < y_offset + 50:
-                current_cell_type = cell_type
-                print(f"Selected: {text} ({cell_type})")
         x_offset += 80
 
     # Draw selected cell preview
@@ -152,6 +180,22 @@ def draw_legend():
     pygame.draw.rect(screen, get_color_from_cell_type(current_cell_type), (WIDTH - 70, 810, 50, 50))
     label = legend_font.render("Selected", True, BLACK)
     screen.blit(label, (WIDTH - 71, 870))
+    return bezel_rect
+
+def select_from_legend(mx, my):
+    # same boxes draw_legend draws; returns True if the selection changed
+    global current_cell_type
+    names = {3: "Start", 4: "End", 1: "Wall", 2: "Low Cost", 0: "Eraser"}
+    x_offset = GRID_OFFSET_X + 20
+    for cell_type in (3, 4, 1, 2, 0):
+        if x_offset < mx < x_offset + 50 and 810 < my < 860:
+            if current_cell_type != cell_type:
+                current_cell_type = cell_type
+                print(f"Selected: {names[cell_type]} ({cell_type})")
+                return True
+            return False
+        x_offset += 80
+    return False
 
 def draw_instructions():
     pygame.draw.rect(screen, INSTRUCTION_BG, (0, 0, GRID_OFFSET_X, 800))
@@ -166,6 +210,9 @@ def draw_instructions():
         "- Right click to erase.",
         "- Press SPACE to find path.",
         "- Press C to clear grid.",
+        "- Press S to save, L to load.",
+        "- Wheel or +/- to zoom,",
+        "  arrow keys to scroll.",
         "- Press ESC to quit.",
         "",
     ]
@@ -175,123 +222,294 @@ def draw_instructions():
         screen.blit(label, (20, y))
         y += 30
 
-def get_color_from_cell_type(cell_type):
-    if cell_type == 1:
-        return BLACK
-    elif cell_type == 2:
-        return YELLOW
-    elif cell_type == 3:
-        return BLUE
-    elif cell_type == 4:
-        return GREEN
-    else:
-        return WHITE
-
 def draw_arrow(start_pos, end_pos, color=RED, width=4):
     pygame.draw.line(screen, color, start_pos, end_pos, width)
     # Arrowhead
     rotation = np.arctan2(end_pos[1] - start_pos[1], end_pos[0] - start_pos[0])
     arrow_length = 10
     angle = np.pi / 6
-    pygame.draw.line(screen, color, end_pos, 
+    pygame.draw.line(screen, color, end_pos,
                      (end_pos[0] - arrow_length * np.cos(rotation - angle),
                       end_pos[1] - arrow_length * np.sin(rotation - angle)), width)
-    pygame.draw.line(screen, color, end_pos, 
+    pygame.draw.line(screen, color, end_pos,
                      (end_pos[0] - arrow_length * np.cos(rotation + angle),
                       end_pos[1] - arrow_length * np.sin(rotation + angle)), width)
 
+def cell_center(r, c):
+    return (GRID_OFFSET_X + (c - scroll_c) * CELL_SIZE + CELL_SIZE // 2,
+            (r - scroll_r) * CELL_SIZE + CELL_SIZE // 2)
+
+def draw_path(path):
+    # arrows between consecutive visible cells
+    width = 4 if CELL_SIZE >= 20 else max(1, CELL_SIZE // 5)
+    for (r1, c1), (r2, c2) in zip(path, path[1:]):
+        if not (is_visible(r1, c1) and is_visible(r2, c2)):
+            continue
+        draw_arrow(cell_center(r1, c1), cell_center(r2, c2), width=width)
+
+def start_search(start, end):
+    global search, search_route
+    cancel_search()
+    search = route_cache.pathfinder.search_steps(start, end)
+    search_route = (start, end)
+
+def cancel_search():
+    # returns True if a search was running
+    global search
+    running = search is not None
+    if running:
+        search.close()
+        search = None
+    clear_search_overlay()
+    return running
+
+def clear_search_overlay():
+    global rebuild_view
+    # past a few thousand cells one rebuild is cheaper than repainting each
+    if len(search_overlay) > 2000:
+        rebuild_view = True
+    else:
+        dirty_cells.update(search_overlay)
+    search_overlay.clear()
+
+def advance_search():
+    # run the search for up to SEARCH_BUDGET seconds; returns its (cost,
+    # path) once it is done, None while it is still going
+    global search
+    deadline = time.perf_counter() + SEARCH_BUDGET
+    try:
+        while time.perf_counter() < deadline:
+            for _ in range(32):
+                cell, pushed = next(search)
+                search_overlay[cell] = EXPANDED
+                dirty_cells.add(cell)
+                for neighbor in pushed:
+                    search_overlay[neighbor] = CYAN
+                    dirty_cells.add(neighbor)
+    except StopIteration as done:
+        search = None
+        clear_search_overlay()
+        return done.value
+    return None
+
+def show_route(result):
+    global log_message, path_overlay, path_shown, reblit_view
+    total_cost, path = result
+    if path:
+        log_message = f"Path found! Cost: {total_cost}"
+        path_overlay = path
+        path_shown = 0
+        reblit_view = True
+    else:
+        log_message = "No path found."
+
 def draw_log_message():
-    log_font = pygame.font.SysFont("Arial", 14)
-    pygame.draw.rect(screen, WHITE, (10, HEIGHT - 60, 180, 50))  # Background for log
-    pygame.draw.rect(screen, BLACK, (10, HEIGHT - 60, 180, 50), 2)  # Border for log box
+    rect = pygame.Rect(10, HEIGHT - 60, 180, 50)
+    pygame.draw.rect(screen, WHITE, rect)  # Background for log
+    pygame.draw.rect(screen, BLACK, rect, 2)  # Border for log box
     log_label = log_font.render(log_message, True, BLACK)
     screen.blit(log_label, (15, HEIGHT - 50))
+    return rect
+
+def scroll_to(r, c):
+    global scroll_r, scroll_c, rebuild_view
+    rows, cols = VIEW_HEIGHT // CELL_SIZE, VIEW_WIDTH // CELL_SIZE
+    r = max(0, min(r, ROWS - rows))
+    c = max(0, min(c, COLS - cols))
+    if (r, c) != (scroll_r, scroll_c):
+        scroll_r, scroll_c = r, c
+        rebuild_view = True
+
+def zoom(step):
+    global CELL_SIZE, rebuild_view
+    size = max(MIN_CELL_SIZE, min(MAX_CELL_SIZE, CELL_SIZE * 2 if step > 0 else CELL_SIZE // 2))
+    if size != CELL_SIZE:
+        CELL_SIZE = size
+        rebuild_view = True
+        scroll_to(scroll_r, scroll_c)
+
+def update_view():
+    # bring view_surface up to date; returns the screen rects of the cells
+    # that were repainted (none after a full rebuild)
+    global rebuild_view
+    if rebuild_view:
+        build_view()
+        dirty_cells.clear()
+        rebuild_view = False
+    rects = [draw_cell(r, c).move(GRID_OFFSET_X, 0) for r, c in dirty_cells if is_visible(r, c)]
+    dirty_cells.clear()
+    return rects
+
+def reset_map(grid):
+    # start over on grid (a WarehouseGrid), e.g. after C or L
+    global warehouse, route_cache, ROWS, COLS, CELL_SIZE, start_placed, end_placed, path_overlay, rebuild_view
+    cancel_search()
+    warehouse = grid.to_chars()
+    route_cache = RouteCache(grid)
+    ROWS, COLS = grid.shape
+    CELL_SIZE = max(MIN_CELL_SIZE, min(VIEW_WIDTH // COLS, VIEW_HEIGHT // ROWS))
+    start_placed = bool(grid.find('S'))
+    end_placed = bool(grid.find('D'))
+    path_overlay = []
+    dirty_cells.clear()
+    scroll_to(0, 0)
+    rebuild_view = True
+
+
+if __name__ == "__main__":
+    # the window, fonts and clock only exist when run as the editor, so the
+    # helpers above can be imported without opening a window
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Warehouse Editor + Pathfinding")
+    pygame.key.set_repeat(200, 30)
+    clock = pygame.time.Clock()
+
+    # created once; SysFont is slow enough to show up when called every frame
+    font = pygame.font.SysFont("Arial", 18)
+    legend_font = pygame.font.SysFont("Arial", 16)
+    log_font = pygame.font.SysFont("Arial", 14)
 
+    # optional map size on the command line: python mapbuildingsim.py 200 200
+    if len(sys.argv) > 2:
+        reset_map(WarehouseGrid(np.zeros((int(sys.argv[1]), int(sys.argv[2])), dtype=np.uint8)))
 
-running = True
-while running:
-    screen.fill(WHITE)
-
-    draw_instructions()
+    full_redraw = True
+    running = True
+    while running:
+        old_message = log_message
+        legend_changed = False
 
-    for r in range(ROWS):
-        for c in range(COLS):
-            rect = pygame.Rect(GRID_OFFSET_X + c * CELL_SIZE, r * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            pygame.draw.rect(screen, get_color_from_cell_type([k for k, v in cell_types.items() if v == warehouse[r][c]][0]), rect)
-            pygame.draw.rect(screen, GRAY, rect, 1)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
 
-    draw_legend()
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                legend_changed |= select_from_legend(*event.pos)
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
+            if event.type == pygame.MOUSEWHEEL:
+                zoom(event.y)
 
-        if pygame.mouse.get_pressed()[0]:  # lc
-            x, y = pygame.mouse.get_pos()
-            if GRID_OFFSET_X <= x < WIDTH and y < 800:
-                c, r = (x - GRID_OFFSET_X) // CELL_SIZE, y // CELL_SIZE
-                if 0 <= r < ROWS and 0 <= c < COLS:
+            if pygame.mouse.get_pressed()[0]:  # lc
+                cell = cell_at(*pygame.mouse.get_pos())
+                if cell is not None:
+                    r, c = cell
                     if current_cell_type == 0:  # eraser
-                        warehouse[r][c] = '.'
+                        set_cell(r, c, '.')
                     elif current_cell_type == 3:  # start
                         if not start_placed:  # Allow placing only one Start
-                            warehouse[r][c] = 'S'
+                            set_cell(r, c, 'S')
                             start_placed = True
                             log_message = "Start placed."
                         else:
                             log_message = "Start already placed!"
                     elif current_cell_type == 4:  # end
                         if not end_placed:  # Allow placing only one end
-                            warehouse[r][c] = 'D'
+                            set_cell(r, c, 'D')
                             end_placed = True
                             log_message = "Destination placed."
                         else:
                             log_message = "Destination already placed!"
                     else:
-                        warehouse[r][c] = cell_types[current_cell_type]
+                        set_cell(r, c, cell_types[current_cell_type])
 
-        if pygame.mouse.get_pressed()[2]:  # rc
-            x, y = pygame.mouse.get_pos()
-            if GRID_OFFSET_X <= x < WIDTH and y < 800:
-                c, r = (x - GRID_OFFSET_X) // CELL_SIZE, y // CELL_SIZE
-                if 0 <= r < ROWS and 0 <= c < COLS:
+            if pygame.mouse.get_pressed()[2]:  # rc
+                cell = cell_at(*pygame.mouse.get_pos())
+                if cell is not None:
+                    r, c = cell
                     if warehouse[r][c] == 'S':  # If it's start, allow erasing it
                         start_placed = False
                     elif warehouse[r][c] == 'D':  # If it's end, allow erasing it
                         end_placed = False
-                    warehouse[r][c] = '.'
-
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                start, end = find_start_end(warehouse)
-                if start and end:
-                    pathfinder = DijkstraPathfinder(warehouse)
-                    total_cost, path = pathfinder.dijkstra(start, end)
-                    if path:
-                        log_message = f"Path found! Cost: {total_cost}"
-                        for i in range(len(path) - 1):
-                            r1, c1 = path[i]
-                            r2, c2 = path[i + 1]
-                            start_pos = (GRID_OFFSET_X + c1 * CELL_SIZE + CELL_SIZE // 2, r1 * CELL_SIZE + CELL_SIZE // 2)
-                            end_pos = (GRID_OFFSET_X + c2 * CELL_SIZE + CELL_SIZE // 2, r2 * CELL_SIZE + CELL_SIZE // 2)
-                            draw_arrow(start_pos, end_pos)
-                            pygame.display.update()
-                            pygame.time.delay(100)
+                    set_cell(r, c, '.')
+
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    start, end = find_start_end(warehouse)
+                    if start and end:
+                        if path_overlay:
+                            path_overlay = []
+                            reblit_view = True
+                        # repeated presses on an unchanged grid skip the search
+                        cached = route_cache.cached_route(start, end)
+                        if cached is not None:
+                            show_route(cached)
+                        else:
+                            start_search(start, end)
                     else:
-                        log_message = "No path found."
-                else:
-                    log_message = "Start and Destination not set!"
-
-            if event.key == pygame.K_c:
-                warehouse = [['.' for _ in range(COLS)] for _ in range(ROWS)]
-                start_placed = False
-                end_placed = False
-                log_message = "Grid cleared."
-
-            if event.key == pygame.K_ESCAPE:
-                running = False
-
-    draw_log_message()
-    pygame.display.flip()
-
-pygame.quit()
+                        log_message = "Start and Destination not set!"
+
+                if event.key == pygame.K_c:
+                    reset_map(WarehouseGrid.from_chars([['.' for _ in range(COLS)] for _ in range(ROWS)]))
+                    log_message = "Grid cleared."
+
+                if event.key == pygame.K_s:
+                    save_map(MAP_FILE, route_cache.grid)
+                    log_message = f"Saved to {MAP_FILE}."
+
+                if event.key == pygame.K_l:
+                    try:
+                        reset_map(load_map(MAP_FILE, mmap=False))
+                        log_message = f"Loaded {MAP_FILE}."
+                    except (OSError, ValueError) as e:
+                        log_message = f"Load failed: {e}"
+
+                if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                    zoom(1)
+                if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    zoom(-1)
+                step = max(1, VIEW_HEIGHT // CELL_SIZE // 10)
+                if event.key == pygame.K_UP:
+                    scroll_to(scroll_r - step, scroll_c)
+                if event.key == pygame.K_DOWN:
+                    scroll_to(scroll_r + step, scroll_c)
+                if event.key == pygame.K_LEFT:
+                    scroll_to(scroll_r, scroll_c - step)
+                if event.key == pygame.K_RIGHT:
+                    scroll_to(scroll_r, scroll_c + step)
+
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+
+        if search is not None:
+            result = advance_search()
+            if result is None:
+                log_message = f"Searching... {route_cache.pathfinder.nodes_expanded} cells expanded"
+            else:
+                route_cache.add_route(*search_route, result)
+                show_route(result)
+
+        reblit_view = reblit_view or rebuild_view
+        view_rect = pygame.Rect(GRID_OFFSET_X, 0, VIEW_WIDTH, VIEW_HEIGHT)
+        updated = []
+        for rect in update_view():
+            if not reblit_view:
+                screen.blit(view_surface, rect, rect.move(-GRID_OFFSET_X, 0))
+                updated.append(rect)
+        if reblit_view or full_redraw:
+            screen.blit(view_surface, (GRID_OFFSET_X, 0))
+            draw_path(path_overlay[:path_shown + 1])
+            updated.append(view_rect)
+            reblit_view = False
+        if path_shown < len(path_overlay) - 1:
+            # reveal the path over about a second, a few steps per frame
+            step = max(1, len(path_overlay) // 60)
+            draw_path(path_overlay[path_shown:path_shown + step + 1])
+            path_shown += step
+            updated.append(view_rect)
+
+        if full_redraw:
+            draw_instructions()
+        if full_redraw or legend_changed:
+            updated.append(draw_legend())
+        if full_redraw or log_message != old_message:
+            updated.append(draw_log_message())
+
+        if full_redraw:
+            pygame.display.flip()
+            full_redraw = False
+        elif updated:
+            pygame.display.update(updated)
+        clock.tick(60)
+
+    pygame.quit()
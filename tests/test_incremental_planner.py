@@ -0,0 +1,15 @@
+from warehouse_nav import DijkstraPathfinder, DStarLite
+
+
+def test_plan_after_edits_with_zero_cost_tie():
+    # stepping onto the 'S' ties with going right; the search used to stop
+    # with the 'S' cell inconsistent and plan() walked in circles to inf
+    planner = DStarLite([list('.X'), list('.P'), list('S.')], (2, 0), (1, 1))
+    planner.update_cell(1, 0, 'P')
+    planner.update_cell(0, 0, 'P')
+    planner.move_to((1, 0))
+    planner.update_cell(1, 1, '.')
+
+    expected = DijkstraPathfinder(planner.grid.to_chars()).dijkstra((1, 0), (1, 1))
+    assert expected[0] == 1.0
+    assert planner.plan() == expected
@@ -0,0 +1,52 @@
+import random
+
+from warehouse_nav import MultiRobotPlanner
+
+
+def test_cooperative_passes_through_a_start_cell_after_it_is_left():
+    planner = MultiRobotPlanner([list('.....'), list('XX.XX')])
+    tasks = [((0, 0), (0, 4)), ((0, 2), (1, 2))]
+    expected = planner.plan(tasks, method='cbs')
+    assert planner.plan(tasks) == expected
+    # a second call must not see the first call's reservations
+    assert planner.plan(tasks) == expected
+
+
+def test_cbs_with_a_later_start_time():
+    planner = MultiRobotPlanner([list('.....'), list('..X..')])
+    tasks = [((0, 0), (0, 4)), ((0, 4), (0, 0))]
+    assert planner.plan(tasks, method='cbs', start_time=5) == planner.plan(tasks, method='cbs')
+
+
+def assert_no_collisions(plans, tasks):
+    # robots wait at their last cell; unroutable ones never leave their start
+    paths = [path or [start] for (_, path), (start, _) in zip(plans, tasks)]
+    horizon = max(len(path) for path in paths) + 1
+
+    def at(path, t):
+        return path[min(t, len(path) - 1)]
+
+    for i in range(len(paths)):
+        for j in range(i + 1, len(paths)):
+            for t in range(horizon):
+                assert at(paths[i], t) != at(paths[j], t)
+                assert not (at(paths[i], t) == at(paths[j], t + 1) and at(paths[i], t + 1) == at(paths[j], t))
+
+
+def test_cooperative_replans_around_a_robot_that_cannot_move():
+    planner = MultiRobotPlanner([list('.....')])
+    tasks = [((0, 0), (0, 4)), ((0, 2), (0, 3))]
+    plans = planner.plan(tasks)
+    assert_no_collisions(plans, tasks)
+
+
+def test_cooperative_plans_never_collide():
+    rng = random.Random(0)
+    for _ in range(50):
+        grid = [[rng.choice('...X') for _ in range(5)] for _ in range(4)]
+        cells = [(r, c) for r in range(4) for c in range(5) if grid[r][c] != 'X']
+        if len(cells) < 8:
+            continue
+        chosen = rng.sample(cells, 8)
+        tasks = list(zip(chosen[:4], chosen[4:]))
+        assert_no_collisions(MultiRobotPlanner(grid).plan(tasks), tasks)
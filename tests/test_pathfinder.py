@@ -0,0 +1,26 @@
+import random
+
+from warehouse_nav import DijkstraPathfinder
+
+
+def test_main_demo_path_matches_the_original_scan():
+    grid = [list('S....'), list('XX.X.'), list('.PP..'), list('.X..D'), list('...X.')]
+    pathfinder = DijkstraPathfinder(grid)
+    expected = (6.5, [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (3, 2), (3, 3), (3, 4)])
+    assert pathfinder.dijkstra((0, 0), (3, 4), engine='scan') == expected
+    assert pathfinder.dijkstra((0, 0), (3, 4), scan_ties=True) == expected
+    assert pathfinder.dijkstra((0, 0), (3, 4))[0] == expected[0]
+
+
+def test_heap_breaks_ties_like_the_scan():
+    rng = random.Random(0)
+    for _ in range(200):
+        rows, cols = rng.randint(2, 12), rng.randint(2, 12)
+        grid = [[rng.choice('....XPS') for _ in range(cols)] for _ in range(rows)]
+        pathfinder = DijkstraPathfinder(grid)
+        start = (rng.randrange(rows), rng.randrange(cols))
+        destination = (rng.randrange(rows), rng.randrange(cols))
+        scan = pathfinder.dijkstra(start, destination, engine='scan')
+        assert pathfinder.dijkstra(start, destination, scan_ties=True) == scan
+        assert pathfinder.dijkstra(start, destination)[0] == scan[0]
+        assert pathfinder.dijkstra(start, destination) == pathfinder.dijkstra(start, destination, engine='csr')
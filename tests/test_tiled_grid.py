@@ -0,0 +1,24 @@
+from warehouse_nav import DijkstraPathfinder, RouteCache, TiledGrid
+
+
+def test_route_cache_edits_a_tiled_grid():
+    tiled = TiledGrid(6, 6, tile=4)
+    cache = RouteCache(tiled)
+    assert cache.route((0, 0), (5, 5))[0] == 10
+    cache.set_cell(0, 1, 'X')
+    expected = DijkstraPathfinder(tiled.to_grid()).dijkstra((0, 0), (5, 5), engine='csr')
+    assert expected[1][1] != (0, 1)
+    assert cache.route((0, 0), (5, 5)) == expected
+
+
+def test_lane_overlay_keeps_walls_closed():
+    tiled = TiledGrid(4, 4, tile=2)
+    tiled.set_cell(1, 1, 'X')
+    closed = tiled.add_overlay(2, 0, 3, 4, cell='X')
+    tiled.add_overlay(0, 0, 4, 4, cell='P')
+    assert not tiled.is_open(1, 1)
+    assert not tiled.is_open(2, 3)
+    assert tiled.is_open(0, 0) and tiled.cost(0, 0) == 0.5
+    assert not tiled.to_grid().passable[1, 1]
+    tiled.remove_overlay(closed)
+    assert tiled.is_open(2, 3)
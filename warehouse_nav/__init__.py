@@ -0,0 +1,39 @@
+# Warehouse pathfinding as a library. Importing the package loads only the
+# standard library and NumPy; the names in _LAZY (plotting, the asyncio route
+# service, the process pool, the fleet simulator) are imported the first time
+# they are looked up, so worker processes and services start fast.
+import importlib
+
+from .distance_field import DistanceField
+from .grid_generator import generate_batch, generate_grid, iter_grids, label_components
+from .grid_graph import GridGraph
+from .hierarchical_planner import HierarchicalPlanner
+from .incremental_planner import DStarLite
+from .map_format import load_map, save_map
+from .multi_robot import MultiRobotPlanner, ReservationTable
+from .pathfinder import DijkstraPathfinder, find_start_end, print_grid_with_path
+from .route_cache import RouteCache
+from .search_stats import SearchStats
+from .tiled_grid import TiledGrid
+from .tour_planner import TourPlanner
+from .warehouse_grid import WarehouseGrid
+
+# name -> submodule it comes from
+_LAZY = {
+    'grid_path_visualization': 'plotting',
+    'ParallelRouter': 'parallel_routes',
+    'RouteService': 'route_service',
+    'FleetSimulator': 'fleet_sim',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
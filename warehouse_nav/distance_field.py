@@ -0,0 +1,60 @@
+import numpy as np
+
+from .grid_graph import DIRECTIONS
+
+
+class DistanceField:
+    # Result of one full search from source: the cost of reaching every cell
+    # (inf where unreachable) and, packed four cells to a byte, the index into
+    # DIRECTIONS of the move that entered each cell on its shortest path.
+    # Any path out of source is then read back in O(path length).
+    def __init__(self, source, rows, cols, costs, parent_moves):
+        self.source = source
+        self.rows = rows
+        self.cols = cols
+        self.costs = costs
+        self.parent_moves = parent_moves
+        self._moves = memoryview(parent_moves)
+
+    @classmethod
+    def from_search(cls, graph, source, costs, parents):
+        # costs/parents are the id-keyed dicts returned by GridGraph.dijkstra
+        rows, cols = graph.rows, graph.cols
+        dense = np.full(rows * cols, np.inf)
+        if costs:
+            dense[np.fromiter(costs.keys(), dtype=np.int64, count=len(costs))] = \
+                np.fromiter(costs.values(), dtype=np.float64, count=len(costs))
+
+        moves = np.zeros(rows * cols + (-rows * cols) % 4, dtype=np.uint8)
+        if parents:
+            child = np.fromiter(parents.keys(), dtype=np.int64, count=len(parents))
+            step = child - np.fromiter(parents.values(), dtype=np.int64, count=len(parents))
+            # vertical steps first: with a single column -1 is also a move up
+            moves[child] = np.select([step == -cols, step == cols, step == -1], [0, 1, 2], 3)
+        moves = moves.reshape(-1, 4)
+        packed = moves[:, 0] | (moves[:, 1] << 2) | (moves[:, 2] << 4) | (moves[:, 3] << 6)
+        return cls(source, rows, cols, dense.reshape(rows, cols), packed)
+
+    def cost(self, destination):
+        r, c = destination
+        return float(self.costs[r, c])
+
+    def reachable(self, destination):
+        r, c = destination
+        return 0 <= r < self.rows and 0 <= c < self.cols and self.costs[r, c] != np.inf
+
+    def path_to(self, destination):
+        # same (cost, path) as DijkstraPathfinder.dijkstra(source, destination)
+        if destination == self.source:
+            return 0, [destination]
+        if not self.reachable(destination):
+            return float('inf'), []
+        path = [destination]
+        r, c = destination
+        while (r, c) != self.source:
+            node = r * self.cols + c
+            dr, dc = DIRECTIONS[(self._moves[node >> 2] >> ((node & 3) * 2)) & 3]
+            r, c = r - dr, c - dc
+            path.append((r, c))
+        path.reverse()
+        return self.cost(destination), path
@@ -0,0 +1,396 @@
+# Headless fleet simulator: N robots serving pick tasks on one warehouse map.
+#
+# A task sends a robot from wherever it is to a pick location, then to a drop
+# station. Time only moves from one event to the next (task arrival, robot at
+# pick, robot at drop), so an 8-hour shift costs one route plus one walk along
+# it per leg, however long the shift is in simulated time.
+#
+# Congestion: each cell admits one robot per `headway` seconds. A robot that
+# would enter a cell too close to another robot's booked entry waits there.
+# Bookings are made when a leg starts, in dispatch order.
+#
+# Planning is instantaneous in simulated time. Every engine returns a
+# cheapest route, so switching engines changes throughput only where it picks
+# another route of equal cost; the engine comparison is the route latency
+# report, measured in wall-clock time on the legs that actually call the
+# engine. Repeated legs are served from a memo and counted as hits.
+#
+# Run from the repository root:
+#   python -m warehouse_nav.fleet_sim --robots 200 --hours 8
+#   python -m warehouse_nav.fleet_sim --map site.map --engine astar --robots 20 --hours 1
+import argparse
+import heapq
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+from .grid_generator import generate_grid, label_components
+from .grid_graph import BACK_STEP_COST
+from .hierarchical_planner import HierarchicalPlanner
+from .map_format import load_map
+from .route_cache import RouteCache
+from .warehouse_grid import WarehouseGrid
+
+INF = float('inf')
+ENGINES = ['stations', 'cache', 'fields', 'dijkstra', 'csr', 'astar', 'bidirectional', 'jps', 'hpa']
+
+
+class StationRouter:
+    # Every task leg starts or ends at a station (a drop, or where the robots
+    # start), so two searches per station cover all of them: legs out of a station read its distance
+    # field, legs into one follow next hops derived from its cost-to-go array
+    # (one search over the reversed graph). Anything else goes through the
+    # route cache.
+    def __init__(self, grid, stations):
+        self.cache = RouteCache(grid)
+        self.stations = set(stations)
+        self._towards = {}
+
+    def route(self, start, destination):
+        if start in self.stations:
+            return self.cache.distance_field(start).path_to(destination)
+        if destination in self.stations and start != destination:
+            return self._descend(start, destination)
+        return self.cache.route(start, destination)
+
+    def _next_hops(self, destination):
+        # (cost to destination, next node on a cheapest path) per node; an
+        # edge u -> v is on one when cost[u] == cost[v] + weight. Comparing
+        # floats with == is exact here only because cost[u] was itself
+        # computed as that same float64 sum by costs_to(), so the test must
+        # keep that order of addition
+        if destination not in self._towards:
+            graph = self.cache.pathfinder.graph
+            remaining = graph.costs_to(graph.node_id(destination))
+            src = np.repeat(np.arange(graph.num_nodes), np.diff(graph.indptr))
+            on_path = np.isfinite(remaining[src]) & \
+                (remaining[src] == remaining[graph.indices] + graph.weights)
+            edges = np.flatnonzero(on_path)
+            nodes, first = np.unique(src[edges], return_index=True)
+            hops = np.full(graph.num_nodes, -1, dtype=np.int64)
+            hops[nodes] = graph.indices[edges[first]]
+            self._towards[destination] = (remaining.tolist(), hops.tolist())
+        return self._towards[destination]
+
+    def _descend(self, start, destination):
+        cols = self.cache.grid.cols
+        r, c = start
+        if not (0 <= r < self.cache.grid.rows and 0 <= c < cols):
+            return INF, []
+        remaining, hops = self._next_hops(destination)
+        node = r * cols + c
+        if remaining[node] == INF:
+            return INF, []
+        target = destination[0] * cols + destination[1]
+        path = [start]
+        while node != target:
+            node = hops[node]
+            path.append(divmod(node, cols))
+        return remaining[r * cols + c], path
+
+
+def make_router(engine, grid, stations=()):
+    # route(start, destination) -> (cost, path) for an engine name; a callable
+    # is used as is
+    if callable(engine):
+        return engine
+    if engine == 'stations':
+        return StationRouter(grid, stations).route
+    if engine == 'hpa':
+        return HierarchicalPlanner(grid).route
+    cache = RouteCache(grid)
+    pathfinder = cache.pathfinder
+    routers = {
+        # every pick/drop pair is searched once, then served from the LRU
+        'cache': cache.route,
+        # one distance field per location a robot leaves from
+        'fields': lambda s, d: cache.distance_field(s).path_to(d),
+        'dijkstra': pathfinder.dijkstra,
+        'csr': lambda s, d: pathfinder.dijkstra(s, d, engine='csr'),
+        'astar': pathfinder.astar,
+        'bidirectional': pathfinder.bidirectional,
+        'jps': pathfinder.jump_point_search,
+    }
+    if engine not in routers:
+        raise ValueError(f"Unknown engine: {engine!r}")
+    return routers[engine]
+
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return {f"p{p}": None for p in points}
+    found = np.percentile(values, points)
+    return {f"p{p}": float(v) for p, v in zip(points, found)}
+
+
+class FleetSimulator:
+    # pick_locations default to open cells next to a wall (shelf faces),
+    # drop_locations to the 'D' cells; robots start on the 'S' cells, or on
+    # the drops if there are none. Only locations connected to the chosen
+    # drops are kept, so every task is routable.
+    def __init__(self, grid, robots=10, engine='stations', pick_locations=None, drop_locations=None,
+                 seconds_per_cost=1.0, pick_time=10.0, drop_time=5.0, headway=1.0, seed=None):
+        if not isinstance(grid, WarehouseGrid):
+            grid = WarehouseGrid.from_chars(grid)
+        if robots < 1:
+            raise ValueError("Need at least one robot")
+        self.grid = grid
+        self.robots = robots
+        self.engine = engine if isinstance(engine, str) else getattr(engine, '__name__', 'custom')
+        self.seconds_per_cost = seconds_per_cost
+        self.pick_time = pick_time
+        self.drop_time = drop_time
+        self.headway = headway
+        self.seed = seed
+
+        drops = grid.find('D') if drop_locations is None else list(drop_locations)
+        if not drops:
+            raise ValueError("Map has no drop stations ('D' cells)")
+        # work in the largest connected area that has a drop station
+        labels = label_components(grid.passable)
+        sizes = np.bincount(labels.ravel())
+        sizes[0] = 0
+        component = max((labels[pos] for pos in drops), key=lambda label: sizes[label])
+        if component == 0:
+            raise ValueError("Every drop station is a wall")
+
+        if pick_locations is None:
+            open_cells = grid.passable
+            shelf_face = np.zeros_like(open_cells)
+            shelf_face[1:, :] |= ~open_cells[:-1, :]
+            shelf_face[:-1, :] |= ~open_cells[1:, :]
+            shelf_face[:, 1:] |= ~open_cells[:, :-1]
+            shelf_face[:, :-1] |= ~open_cells[:, 1:]
+            candidates = (labels == component) & shelf_face
+            if not candidates.any():
+                candidates = labels == component
+            pick_locations = [tuple(pos) for pos in np.argwhere(candidates).tolist()]
+        self.drops = [pos for pos in drops if labels[pos] == component]
+        drop_set = set(self.drops)
+        self.picks = [pos for pos in pick_locations if labels[pos] == component and pos not in drop_set]
+        if not self.picks:
+            raise ValueError("No pick locations reachable from the drop stations")
+        starts = [pos for pos in grid.find('S') if labels[pos] == component] or self.drops
+        self.starts = [starts[i % len(starts)] for i in range(robots)]
+        self.route = make_router(engine, grid, self.drops + starts)
+        self._step_time = (grid.costs.reshape(-1) * seconds_per_cost).tolist()
+        # (start, destination) -> (flat cell ids, seconds per step) of the route
+        self._legs = {}
+
+    def _leg(self, start, destination):
+        key = (start, destination)
+        if key not in self._legs:
+            _, path = self.route(start, destination)
+            if not path:
+                self._legs[key] = None
+            else:
+                # same move costs as DijkstraPathfinder.get_cost; a move up or
+                # left is exactly one that lowers the flat cell id
+                cols = self.grid.cols
+                cells = [r * cols + c for r, c in path]
+                step_time = self._step_time
+                back_time = BACK_STEP_COST * self.seconds_per_cost
+                steps = [back_time if b < a else step_time[b] for a, b in zip(cells, cells[1:])]
+                self._legs[key] = (cells[1:], steps)
+        return self._legs[key]
+
+    def run(self, hours=8.0, tasks_per_hour=None):
+        # tasks_per_hour=None keeps every robot busy (a task is waiting
+        # whenever one frees up), which measures the fleet's capacity;
+        # otherwise tasks arrive as a Poisson process at that rate
+        if hours <= 0:
+            raise ValueError("Simulated time must be positive")
+        rng = random.Random(self.seed)
+        horizon = hours * 3600.0
+        events = []
+        seq = 0
+
+        def schedule(t, kind, data):
+            nonlocal seq
+            heapq.heappush(events, (t, seq, kind, data))
+            seq += 1
+
+        positions = list(self.starts)
+        busy_since = [None] * self.robots
+        busy_time = [0.0] * self.robots
+        idle = deque(range(self.robots))
+        waiting = deque()
+        cell_count = self.grid.rows * self.grid.cols
+        last_entry = [-INF] * cell_count
+        cell_wait = [0.0] * cell_count
+        route_latency = []
+        leg_hits = 0
+        cycle_times = []
+        wait_total = 0.0
+        unroutable = 0
+        completed = 0
+
+        def new_task(now):
+            return (now, rng.choice(self.picks), rng.choice(self.drops))
+
+        def walk(leg, t):
+            # entry times along the leg with congestion waits; returns arrival
+            nonlocal wait_total
+            cells, steps = leg
+            headway = self.headway
+            for cell, step in zip(cells, steps):
+                t += step
+                booked = last_entry[cell]
+                if -headway < t - booked < headway:
+                    wait = booked + headway - t
+                    t += wait
+                    wait_total += wait
+                    cell_wait[cell] += wait
+                if t > booked:
+                    last_entry[cell] = t
+            return t
+
+        def start_leg(robot, destination, now):
+            nonlocal unroutable, leg_hits
+            if (positions[robot], destination) in self._legs:
+                leg_hits += 1
+                leg = self._legs[(positions[robot], destination)]
+            else:
+                # only legs that call the engine are timed
+                t = time.perf_counter()
+                leg = self._leg(positions[robot], destination)
+                route_latency.append(time.perf_counter() - t)
+            if leg is None:
+                unroutable += 1
+                return None
+            return walk(leg, now)
+
+        def dispatch(robot, task, now):
+            arrival = start_leg(robot, task[1], now)
+            if arrival is None:
+                release(robot, now)
+                return
+            if busy_since[robot] is None:
+                busy_since[robot] = now
+            positions[robot] = task[1]
+            schedule(arrival + self.pick_time, 'picked', (robot, task))
+
+        def release(robot, now):
+            if busy_since[robot] is not None:
+                busy_time[robot] += min(now, horizon) - busy_since[robot]
+                busy_since[robot] = None
+            if tasks_per_hour is None:
+                dispatch(robot, new_task(now), now)
+            elif waiting:
+                dispatch(robot, waiting.popleft(), now)
+            else:
+                idle.append(robot)
+
+        if tasks_per_hour is None:
+            while idle:
+                robot = idle.popleft()
+                dispatch(robot, new_task(0.0), 0.0)
+        elif tasks_per_hour > 0:
+            schedule(rng.expovariate(tasks_per_hour / 3600.0), 'arrival', None)
+
+        t0 = time.perf_counter()
+        while events and events[0][0] <= horizon:
+            now, _, kind, data = heapq.heappop(events)
+            if kind == 'arrival':
+                task = new_task(now)
+                if idle:
+                    dispatch(idle.popleft(), task, now)
+                else:
+                    waiting.append(task)
+                schedule(now + rng.expovariate(tasks_per_hour / 3600.0), 'arrival', None)
+            elif kind == 'picked':
+                robot, task = data
+                arrival = start_leg(robot, task[2], now)
+                if arrival is None:
+                    release(robot, now)
+                    continue
+                positions[robot] = task[2]
+                schedule(arrival + self.drop_time, 'dropped', (robot, task))
+            else:
+                robot, task = data
+                completed += 1
+                cycle_times.append(now - task[0])
+                release(robot, now)
+        wall_time = time.perf_counter() - t0
+
+        for robot in range(self.robots):
+            if busy_since[robot] is not None:
+                busy_time[robot] += horizon - busy_since[robot]
+        utilization = [busy / horizon for busy in busy_time]
+        hotspots = [(cell, cell_wait[cell]) for cell in np.argsort(cell_wait)[::-1][:5].tolist()
+                    if cell_wait[cell] > 0]
+        latency_ms = [latency * 1000 for latency in route_latency]
+        legs = leg_hits + len(route_latency)
+        return {
+            'engine': self.engine,
+            'robots': self.robots,
+            'hours': hours,
+            'tasks_completed': completed,
+            'tasks_waiting': len(waiting),
+            'throughput_per_hour': completed / hours,
+            'route_latency_ms': {**percentiles(latency_ms), 'max': max(latency_ms, default=None)},
+            'cycle_time_s': percentiles(cycle_times),
+            'utilization_mean': float(np.mean(utilization)),
+            'utilization_min': float(np.min(utilization)),
+            'utilization_max': float(np.max(utilization)),
+            'congestion_wait_s': wait_total,
+            'wait_per_task_s': wait_total / completed if completed else 0.0,
+            'hotspots': [(divmod(cell, self.grid.cols), wait) for cell, wait in hotspots],
+            'unroutable': unroutable,
+            'routes': len(route_latency),
+            'legs': legs,
+            'leg_hit_rate': leg_hits / legs if legs else 0.0,
+            'wall_time_s': wall_time,
+        }
+
+
+def demo_grid(size, stations, seed):
+    # a generated map with `stations` drop stations spread along the bottom row
+    grid = generate_grid(size, size, 0.2, 0.1, seed)
+    for c in np.linspace(0, size - 1, stations).astype(int):
+        grid.set_cell(size - 1, int(c), 'D')
+    return grid
+
+
+def format_report(report):
+    lines = [f"{report['engine']}: {report['robots']} robots, {report['hours']:g} h, "
+             f"{report['tasks_completed']} tasks ({report['throughput_per_hour']:.1f}/h), "
+             f"{report['wall_time_s']:.2f} s wall"]
+    lines.append(f"  legs: {report['legs']}, {report['routes']} routed by the engine, "
+                 f"{report['leg_hit_rate']:.1%} repeats")
+    latency = report['route_latency_ms']
+    if latency['p50'] is not None:
+        lines.append("  route latency ms: " + ", ".join(f"{k} {v:.3f}" for k, v in latency.items()))
+    cycle = report['cycle_time_s']
+    if cycle['p50'] is not None:
+        lines.append("  cycle time s: " + ", ".join(f"{k} {v:.1f}" for k, v in cycle.items()))
+    lines.append(f"  utilization: mean {report['utilization_mean']:.1%}, "
+                 f"min {report['utilization_min']:.1%}, max {report['utilization_max']:.1%}")
+    lines.append(f"  congestion: {report['congestion_wait_s']:.0f} s waiting, "
+                 f"{report['wait_per_task_s']:.1f} s per task")
+    if report['hotspots']:
+        lines.append("  hotspots: " + ", ".join(f"{cell} {wait:.0f}s" for cell, wait in report['hotspots']))
+    if report['unroutable']:
+        lines.append(f"  unroutable legs: {report['unroutable']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate a robot fleet serving pick tasks")
+    parser.add_argument('--map', help="map file written by map_format.save_map (default: generated)")
+    parser.add_argument('--size', type=int, default=100, help="side of the generated map")
+    parser.add_argument('--stations', type=int, default=8, help="drop stations on the generated map")
+    parser.add_argument('--robots', type=int, default=50)
+    parser.add_argument('--hours', type=float, default=8.0)
+    parser.add_argument('--rate', type=float, default=None, help="tasks per hour (default: saturated)")
+    parser.add_argument('--engine', nargs='+', default=['stations'], choices=ENGINES)
+    parser.add_argument('--headway', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    grid = load_map(args.map) if args.map else demo_grid(args.size, args.stations, args.seed)
+    for engine in args.engine:
+        simulator = FleetSimulator(grid, args.robots, engine, headway=args.headway, seed=args.seed)
+        print(format_report(simulator.run(args.hours, args.rate)))
@@ -0,0 +1,130 @@
+import numpy as np
+
+from .warehouse_grid import CELL_TYPES, WarehouseGrid
+
+FLOOR, WALL, SLOW, START, DEST = (CELL_TYPES.index(cell) for cell in '.XPSD')
+
+
+def _runs(passable):
+    # id of the horizontal run of open cells each cell belongs to, 0 for
+    # walls. A run never spans two rows because a new one starts at every
+    # column 0, and never two grids of a stack for the same reason.
+    starts = passable.copy()
+    starts[..., 1:] &= ~passable[..., :-1]
+    ids = np.cumsum(starts.ravel(), dtype=np.int64).reshape(passable.shape)
+    ids[~passable] = 0
+    return ids, int(ids.max(initial=0)) + 1
+
+
+def label_components(passable):
+    # connected-component label of every cell (4-connected, open cells only),
+    # 0 for walls; two cells share a label exactly when one can be reached
+    # from the other. Works on one (rows, cols) grid or a (count, rows, cols)
+    # stack at once.
+    # Union-find over horizontal runs instead of cells: open cells stacked
+    # vertically join their two runs, every round hooks each root onto the
+    # smallest root it touches and then compresses all parent pointers, so
+    # it takes a handful of whole-array rounds even on winding layouts.
+    passable = np.asarray(passable, dtype=bool)
+    if passable.ndim not in (2, 3):
+        raise ValueError("Expected a 2D grid or a 3D stack of grids")
+    ids, count = _runs(passable)
+    joined = passable[..., :-1, :] & passable[..., 1:, :]
+    upper = ids[..., :-1, :][joined]
+    lower = ids[..., 1:, :][joined]
+
+    parent = np.arange(count)
+    while True:
+        before = parent.copy()
+        root_upper, root_lower = parent[upper], parent[lower]
+        smaller = np.minimum(root_upper, root_lower)
+        np.minimum.at(parent, root_upper, smaller)
+        np.minimum.at(parent, root_lower, smaller)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        if np.array_equal(parent, before):
+            return parent[ids]
+
+
+def flood_fill(passable, seeds):
+    # boolean mask of the open cells reachable from any open seed cell
+    labels = label_components(passable)
+    seeds = np.asarray(seeds, dtype=bool)
+    if seeds.shape != labels.shape:
+        raise ValueError("Seeds must have the same shape as the grid")
+    hit = np.zeros(int(labels.max(initial=0)) + 1, dtype=bool)
+    hit[labels[seeds]] = True
+    hit[0] = False
+    return hit[labels]
+
+
+def reachable(grid, start, destination):
+    # same answer as "dijkstra finds a path", without computing any costs
+    grid = grid if isinstance(grid, WarehouseGrid) else WarehouseGrid.from_chars(grid)
+    if start == destination:
+        return True
+    seeds = np.zeros(grid.shape, dtype=bool)
+    seeds[start] = True
+    return bool(flood_fill(grid.passable, seeds)[destination])
+
+
+def _draw(rng, count, rows, cols, obstacle_prob, slow_prob):
+    # the per-cell rule of generate_game_grid, for count grids at once
+    draw = rng.random((count, rows, cols))
+    codes = np.full((count, rows, cols), FLOOR, dtype=np.uint8)
+    codes[draw < obstacle_prob + slow_prob] = SLOW
+    codes[draw < obstacle_prob] = WALL
+    codes[:, 0, 0] = START
+    codes[:, -1, -1] = DEST
+    return codes
+
+
+def generate_batch(count, rows, cols, obstacle_prob=0.2, slow_prob=0.1, seed=None,
+                   connected=True, max_draws=None):
+    # (count, rows, cols) uint8 codes of random layouts with S in the top left
+    # and D in the bottom right. With connected=True only layouts where D can
+    # be reached from S are kept; rejected ones are redrawn in bulk until
+    # count are found. seed is anything np.random.default_rng accepts,
+    # including a Generator to continue its stream.
+    if count < 0 or rows < 1 or cols < 1 or rows * cols < 2:
+        raise ValueError("Need a non-negative count and at least two cells per grid")
+    if obstacle_prob < 0 or slow_prob < 0 or obstacle_prob + slow_prob > 1:
+        raise ValueError("Probabilities must be non-negative and sum to at most 1")
+    rng = np.random.default_rng(seed)
+    if not connected:
+        return _draw(rng, count, rows, cols, obstacle_prob, slow_prob)
+
+    if max_draws is None:
+        max_draws = max(1000, 100 * count)
+    result = np.empty((count, rows, cols), dtype=np.uint8)
+    found = 0
+    drawn = 0
+    # about 4M cells per batch bounds the memory of one labelling pass
+    batch = max(1, min(count, (1 << 22) // (rows * cols)))
+    while found < count:
+        if drawn >= max_draws:
+            raise RuntimeError(f"Only {found} of {count} connected grids in {drawn} draws; "
+                               "lower obstacle_prob")
+        codes = _draw(rng, batch, rows, cols, obstacle_prob, slow_prob)
+        drawn += batch
+        labels = label_components(codes != WALL)
+        keep = codes[labels[:, 0, 0] == labels[:, -1, -1]][:count - found]
+        result[found:found + len(keep)] = keep
+        found += len(keep)
+    return result
+
+
+def generate_grid(rows, cols, obstacle_prob=0.2, slow_prob=0.1, seed=None, connected=True):
+    # one WarehouseGrid from generate_batch
+    return WarehouseGrid(generate_batch(1, rows, cols, obstacle_prob, slow_prob, seed, connected)[0])
+
+
+def iter_grids(rows, cols, obstacle_prob=0.2, slow_prob=0.1, seed=None, connected=True, batch=1024):
+    # endless stream of WarehouseGrids for simulations, drawn batch at a time
+    rng = np.random.default_rng(seed)
+    while True:
+        for codes in generate_batch(batch, rows, cols, obstacle_prob, slow_prob, rng, connected):
+            yield WarehouseGrid(codes)
@@ -0,0 +1,292 @@
+import heapq
+
+import numpy as np
+
+from .warehouse_grid import WarehouseGrid
+
+# same order as DijkstraPathfinder.directions
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+# moving up or left always costs this much (see DijkstraPathfinder.get_cost)
+BACK_STEP_COST = 0.5
+
+
+class GridGraph:
+    # The grid compiled once into compressed sparse rows. Node ids are
+    # r * cols + c; the out-edges of node u are indices[indptr[u]:indptr[u + 1]]
+    # with the matching weights, which already include the up/left discount.
+    # Walls are kept as ids but have no edges.
+    def __init__(self, grid):
+        if not isinstance(grid, WarehouseGrid):
+            grid = WarehouseGrid.from_chars(grid)
+        self.grid = grid
+        indptr, indices, weights = self._build(grid)
+        self._set_arrays(grid.rows, grid.cols, indptr, indices, weights, grid.passable.reshape(-1))
+
+    @classmethod
+    def from_arrays(cls, rows, cols, indptr, indices, weights, passable):
+        # wraps already built arrays (e.g. ones living in shared memory)
+        # without copying them; there is no WarehouseGrid behind it
+        graph = cls.__new__(cls)
+        graph.grid = None
+        graph._set_arrays(rows, cols, indptr, indices, weights, passable)
+        return graph
+
+    def _set_arrays(self, rows, cols, indptr, indices, weights, passable):
+        self.rows = rows
+        self.cols = cols
+        self.num_nodes = rows * cols
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.passable = passable
+        # plain memoryviews are much cheaper to index from Python than the arrays
+        self._indptr = memoryview(indptr)
+        self._indices = memoryview(indices)
+        self._weights = memoryview(weights)
+        self._passable = memoryview(passable)
+        self._reverse = None
+        self._forward_step = None
+        self.nodes_expanded = 0
+        # a SearchStats the dijkstra() loop reports into, set by DijkstraPathfinder
+        self.tracer = None
+
+    @staticmethod
+    def _build(grid):
+        rows, cols = grid.rows, grid.cols
+        ids = np.arange(rows * cols, dtype=np.int32).reshape(rows, cols)
+        targets = np.full((rows, cols, len(DIRECTIONS)), -1, dtype=np.int32)
+        costs = np.zeros((rows, cols, len(DIRECTIONS)), dtype=np.float32)
+
+        for k, (dr, dc) in enumerate(DIRECTIONS):
+            # cells whose neighbor in this direction is inside the grid
+            src = (slice(max(-dr, 0), rows - max(dr, 0)), slice(max(-dc, 0), cols - max(dc, 0)))
+            dst = (slice(max(dr, 0), rows - max(-dr, 0)), slice(max(dc, 0), cols - max(-dc, 0)))
+            ok = grid.passable[src] & grid.passable[dst]
+            targets[src + (k,)] = np.where(ok, ids[dst], -1)
+            if (dr, dc) in [(-1, 0), (0, -1)]:
+                costs[src + (k,)] = BACK_STEP_COST
+            else:
+                costs[src + (k,)] = grid.costs[dst]
+
+        valid = targets >= 0
+        indptr = np.zeros(rows * cols + 1, dtype=np.int32)
+        np.cumsum(valid.reshape(rows * cols, -1).sum(axis=1), out=indptr[1:])
+        return indptr, targets[valid], costs[valid]
+
+    def node_id(self, pos):
+        r, c = pos
+        return r * self.cols + c
+
+    def in_bounds(self, pos):
+        r, c = pos
+        return 0 <= r < self.rows and 0 <= c < self.cols
+
+    def position(self, node):
+        return divmod(node, self.cols)
+
+    def neighbors(self, node):
+        for i in range(self._indptr[node], self._indptr[node + 1]):
+            yield self._indices[i], self._weights[i]
+
+    def dijkstra(self, source, target=None, targets=None):
+        # source/target are node ids; stops once target (or every id in
+        # targets) is settled, otherwise runs to exhaustion. Returns cost and
+        # parent dicts keyed by id.
+        indptr, indices, weights = self._indptr, self._indices, self._weights
+        remaining = set(targets) if targets is not None else set()
+        if target is not None:
+            remaining.add(target)
+        costs = {source: 0}
+        parents = {}
+        visited = set()
+        frontier = [(0, source)] if self._passable[source] else []
+        expanded = 0
+        tracer = self.tracer
+        if tracer is not None:
+            tracer.heap_pushes = len(frontier)
+
+        while frontier:
+            cost, current = heapq.heappop(frontier)
+            if current in visited:
+                continue
+            if current in remaining:
+                remaining.discard(current)
+                if not remaining:
+                    break
+
+            visited.add(current)
+            expanded += 1
+
+            for i in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[i]
+                if neighbor in visited:
+                    continue
+                new_cost = cost + weights[i]
+                if new_cost < costs.get(neighbor, float('inf')):
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = current
+                    heapq.heappush(frontier, (new_cost, neighbor))
+                    if tracer is not None:
+                        tracer.edges_relaxed += 1
+                        tracer.heap_pushes += 1
+            if tracer is not None:
+                tracer.expanded(self.position(current), cost, len(frontier))
+
+        self.nodes_expanded = expanded
+        return costs, parents
+
+    def path_to(self, source, target, costs, parents):
+        # same return shape as DijkstraPathfinder.reconstruct_path, with positions
+        path = []
+        cur = target
+        while cur in parents:
+            path.append(cur)
+            cur = parents[cur]
+        if cur == source:
+            path.append(source)
+            path.reverse()
+            return costs[target], [self.position(node) for node in path]
+        else:
+            return float('inf'), []
+
+    def route(self, start, destination):
+        if not (self.in_bounds(start) and self.in_bounds(destination)):
+            return (0, [start]) if start == destination else (float('inf'), [])
+        source, target = self.node_id(start), self.node_id(destination)
+        costs, parents = self.dijkstra(source, target)
+        return self.path_to(source, target, costs, parents)
+
+    def routes_from(self, start, destinations):
+        # one search from start that stops once every destination is settled;
+        # gives the same (cost, path) per destination as separate route() calls
+        if not self.in_bounds(start):
+            self.nodes_expanded = 0
+            return [self.route(start, destination) for destination in destinations]
+        source = self.node_id(start)
+        targets = {self.node_id(d) for d in destinations if self.in_bounds(d)}
+        costs, parents = self.dijkstra(source, targets=targets)
+        results = []
+        for destination in destinations:
+            if self.in_bounds(destination):
+                results.append(self.path_to(source, self.node_id(destination), costs, parents))
+            else:
+                results.append(self.route(start, destination))
+        return results
+
+    def reverse(self):
+        # in-edges in the same CSR layout: for node v, reverse indices hold the
+        # u of every edge u -> v and reverse weights the cost of that move
+        if self._reverse is None:
+            src = np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind='stable')
+            indptr = np.zeros(self.num_nodes + 1, dtype=np.int32)
+            np.cumsum(np.bincount(self.indices, minlength=self.num_nodes), out=indptr[1:])
+            self._reverse = tuple(memoryview(np.ascontiguousarray(array))
+                                  for array in (indptr, src[order], self.weights[order]))
+        return self._reverse
+
+    def costs_to(self, target):
+        # dense array with the cost of getting from every node to target
+        # (inf where target can't be reached), from one search over reverse()
+        indptr, indices, weights = self.reverse()
+        costs = {target: 0}
+        visited = set()
+        frontier = [(0, target)] if self._passable[target] else []
+        while frontier:
+            cost, current = heapq.heappop(frontier)
+            if current in visited:
+                continue
+            visited.add(current)
+            for i in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[i]
+                new_cost = cost + weights[i]
+                if neighbor not in visited and new_cost < costs.get(neighbor, float('inf')):
+                    costs[neighbor] = new_cost
+                    heapq.heappush(frontier, (new_cost, neighbor))
+        dense = np.full(self.num_nodes, np.inf)
+        dense[np.fromiter(costs.keys(), dtype=np.int64, count=len(costs))] = \
+            np.fromiter(costs.values(), dtype=np.float64, count=len(costs))
+        return dense
+
+    def lower_bound(self, a, b):
+        # consistent lower bound on the cost of going from node a to node b:
+        # every up/left step costs BACK_STEP_COST, every down/right step at
+        # least the cheapest down/right edge in this graph
+        if self._forward_step is None:
+            src = np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.indptr))
+            forward = self.weights[self.indices > src]
+            self._forward_step = float(forward.min()) if forward.size else 0.0
+        ar, ac = divmod(a, self.cols)
+        br, bc = divmod(b, self.cols)
+        back = max(ar - br, 0) + max(ac - bc, 0)
+        return back * BACK_STEP_COST + (max(br - ar, 0) + max(bc - ac, 0)) * self._forward_step
+
+    def bidirectional(self, source, target, astar=False):
+        # Searches forward from source over the out-edges and backward from
+        # target over reverse(), stopping once the two smallest frontier keys
+        # add up to the best meeting cost seen. With astar=True both sides use
+        # the average potential (lower_bound(v, target) - lower_bound(source, v)) / 2,
+        # which keeps reduced edge costs non-negative. Returns (cost, path).
+        source_pos, target_pos = self.position(source), self.position(target)
+        if source == target:
+            self.nodes_expanded = 0
+            return 0, [source_pos]
+
+        if astar:
+            def potential(v):
+                return (self.lower_bound(v, target) - self.lower_bound(source, v)) / 2
+        else:
+            def potential(v):
+                return 0
+
+        sides = [
+            (self._indptr, self._indices, self._weights, 1),
+            self.reverse() + (-1,),
+        ]
+        dists = [{source: 0}, {target: 0}]
+        parents = [{}, {}]
+        settled = [set(), set()]
+        frontiers = [[(potential(source), source)] if self._passable[source] else [], [(-potential(target), target)]]
+        best, meet = float('inf'), None
+        expanded = 0
+
+        while frontiers[0] and frontiers[1]:
+            for side in (0, 1):
+                frontier = frontiers[side]
+                while frontier and frontier[0][1] in settled[side]:
+                    heapq.heappop(frontier)
+            if not (frontiers[0] and frontiers[1]):
+                break
+            if frontiers[0][0][0] + frontiers[1][0][0] >= best:
+                break
+
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            indptr, indices, weights, sign = sides[side]
+            dist, other = dists[side], dists[1 - side]
+            _, current = heapq.heappop(frontiers[side])
+            settled[side].add(current)
+            expanded += 1
+            cost = dist[current]
+
+            for i in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[i]
+                if neighbor in settled[side]:
+                    continue
+                new_cost = cost + weights[i]
+                if new_cost < dist.get(neighbor, float('inf')):
+                    dist[neighbor] = new_cost
+                    parents[side][neighbor] = current
+                    heapq.heappush(frontiers[side], (new_cost + sign * potential(neighbor), neighbor))
+                if neighbor in other and dist[neighbor] + other[neighbor] < best:
+                    best, meet = dist[neighbor] + other[neighbor], neighbor
+
+        self.nodes_expanded = expanded
+        if meet is None:
+            return float('inf'), []
+        path = [meet]
+        while path[-1] in parents[0]:
+            path.append(parents[0][path[-1]])
+        path.reverse()
+        while path[-1] in parents[1]:
+            path.append(parents[1][path[-1]])
+        return best, [self.position(node) for node in path]
@@ -0,0 +1,283 @@
+import heapq
+
+from .grid_graph import BACK_STEP_COST, DIRECTIONS
+from .pathfinder import DijkstraPathfinder
+
+# open stretches of a cluster border at least this long get an entrance at
+# each end instead of one in the middle (Botea et al., HPA*)
+WIDE_ENTRANCE = 6
+
+
+class HierarchicalPlanner:
+    # HPA* style planner for large floors. The grid is cut into square
+    # clusters; open stretches along each cluster border become entrances and
+    # every cluster knows the cost between its own entrances, searched with the
+    # normal cost model but without leaving the cluster. A query searches this
+    # small abstract graph and then refines only the segments it uses.
+    #
+    # With the default sparse entrances routes are near-optimal, as in HPA*.
+    # dense_entrances=True makes every border crossing an entrance, which gives
+    # exact optimal costs at the price of a larger abstract graph.
+    # Entrance-to-entrance costs are filled in lazily per cluster (or all at
+    # once by precompute()), and update_cell() only drops the clusters and
+    # borders the edited cell belongs to.
+    def __init__(self, grid, cluster_size=16, dense_entrances=False):
+        self.pathfinder = DijkstraPathfinder(grid)
+        self.grid = self.pathfinder.grid
+        self.rows = self.grid.rows
+        self.cols = self.grid.cols
+        self.cluster_size = cluster_size
+        self.dense_entrances = dense_entrances
+        self.cluster_rows = -(-self.rows // cluster_size)
+        self.cluster_cols = -(-self.cols // cluster_size)
+        self.nodes_expanded = 0
+        self._build()
+
+    def _build(self):
+        self._passable = memoryview(self.grid.passable.reshape(-1))
+        self._cell_costs = memoryview(self.grid.costs.reshape(-1))
+        # (upper/left cluster, lower/right cluster) -> [(cell, cell), ...]
+        self._borders = {}
+        # entrance -> {entrance in the neighbouring cluster: cost}
+        self._inter = {}
+        # cluster -> {entrance: {entrance: cost}}
+        self._intra = {}
+        for cr in range(self.cluster_rows):
+            for cc in range(self.cluster_cols):
+                if cr + 1 < self.cluster_rows:
+                    self._build_border((cr, cc), (cr + 1, cc))
+                if cc + 1 < self.cluster_cols:
+                    self._build_border((cr, cc), (cr, cc + 1))
+        self._revision = self.grid.revision
+
+    def cluster_of(self, pos):
+        return pos[0] // self.cluster_size, pos[1] // self.cluster_size
+
+    def _bounds(self, cluster):
+        k = self.cluster_size
+        r0, c0 = cluster[0] * k, cluster[1] * k
+        return r0, min(r0 + k, self.rows), c0, min(c0 + k, self.cols)
+
+    def _is_open(self, pos):
+        return self._passable[pos[0] * self.cols + pos[1]]
+
+    def _move_cost(self, u, v):
+        if v[0] < u[0] or v[1] < u[1]:
+            return BACK_STEP_COST
+        return self._cell_costs[v[0] * self.cols + v[1]]
+
+    def _build_border(self, upper, lower):
+        key = (upper, lower)
+        for a, b in self._borders.get(key, []):
+            self._inter[a].pop(b, None)
+            self._inter[b].pop(a, None)
+
+        r0, r1, c0, c1 = self._bounds(upper)
+        if lower[0] != upper[0]:
+            pairs = [((r1 - 1, c), (r1, c)) for c in range(c0, c1)]
+        else:
+            pairs = [((r, c1 - 1), (r, c1)) for r in range(r0, r1)]
+
+        # split the border into runs where both sides are open
+        runs, run = [], []
+        for a, b in pairs:
+            if self._is_open(a) and self._is_open(b):
+                run.append((a, b))
+            elif run:
+                runs.append(run)
+                run = []
+        if run:
+            runs.append(run)
+
+        transitions = []
+        for run in runs:
+            if self.dense_entrances:
+                transitions.extend(run)
+            elif len(run) >= WIDE_ENTRANCE:
+                transitions += [run[0], run[-1]]
+            else:
+                transitions.append(run[len(run) // 2])
+
+        for a, b in transitions:
+            self._inter.setdefault(a, {})[b] = self._move_cost(a, b)
+            self._inter.setdefault(b, {})[a] = self._move_cost(b, a)
+        self._borders[key] = transitions
+
+    def _neighbor_clusters(self, cluster):
+        cr, cc = cluster
+        for dr, dc in DIRECTIONS:
+            nr, nc = cr + dr, cc + dc
+            if 0 <= nr < self.cluster_rows and 0 <= nc < self.cluster_cols:
+                yield (nr, nc)
+
+    def entrances(self, cluster):
+        found = set()
+        for other in self._neighbor_clusters(cluster):
+            key = (cluster, other) if other > cluster else (other, cluster)
+            for a, b in self._borders.get(key, []):
+                found.add(a if self.cluster_of(a) == cluster else b)
+        return found
+
+    def _cluster_search(self, source, cluster, targets=(), reverse=False):
+        # Dijkstra that never leaves cluster; with reverse=True it follows
+        # edges backwards, so costs[u] is the cost of going from u to source
+        r0, r1, c0, c1 = self._bounds(cluster)
+        remaining = set(targets)
+        costs = {source: 0}
+        parents = {}
+        visited = set()
+        frontier = [(0, source)]
+        if not self._is_open(source):
+            frontier = []
+
+        while frontier:
+            cost, current = heapq.heappop(frontier)
+            if current in visited:
+                continue
+            visited.add(current)
+            self.nodes_expanded += 1
+            if current in remaining:
+                remaining.discard(current)
+                if not remaining:
+                    break
+
+            r, c = current
+            for dr, dc in DIRECTIONS:
+                neighbor = (r + dr, c + dc)
+                if not (r0 <= neighbor[0] < r1 and c0 <= neighbor[1] < c1):
+                    continue
+                if neighbor in visited or not self._is_open(neighbor):
+                    continue
+                if reverse:
+                    step = self._move_cost(neighbor, current)
+                else:
+                    step = self._move_cost(current, neighbor)
+                new_cost = cost + step
+                if new_cost < costs.get(neighbor, float('inf')):
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = current
+                    heapq.heappush(frontier, (new_cost, neighbor))
+        return costs, parents
+
+    def _intra_edges(self, cluster):
+        if cluster not in self._intra:
+            entrances = self.entrances(cluster)
+            edges = {}
+            for entrance in entrances:
+                costs, _ = self._cluster_search(entrance, cluster, entrances - {entrance})
+                edges[entrance] = {other: costs[other] for other in entrances
+                                   if other != entrance and other in costs}
+            self._intra[cluster] = edges
+        return self._intra[cluster]
+
+    def precompute(self):
+        for cr in range(self.cluster_rows):
+            for cc in range(self.cluster_cols):
+                self._intra_edges((cr, cc))
+
+    def update_cell(self, r, c, cell):
+        self._check_revision()
+        self.grid.set_cell(r, c, cell)
+        if self.grid.revision == self._revision:
+            return
+        self._revision = self.grid.revision
+
+        cluster = self.cluster_of((r, c))
+        r0, r1, c0, c1 = self._bounds(cluster)
+        stale = {cluster}
+        # a cell on the cluster edge also changes the border it sits on
+        for other in self._neighbor_clusters(cluster):
+            on_edge = (other[0] < cluster[0] and r == r0) or (other[0] > cluster[0] and r == r1 - 1) or \
+                      (other[1] < cluster[1] and c == c0) or (other[1] > cluster[1] and c == c1 - 1)
+            if on_edge:
+                self._build_border(*sorted((cluster, other)))
+                stale.add(other)
+        for stale_cluster in stale:
+            self._intra.pop(stale_cluster, None)
+
+    def _check_revision(self):
+        # the grid was edited without going through update_cell
+        if self.grid.revision != self._revision:
+            self._build()
+
+    def route(self, start, destination):
+        # (cost, path) like DijkstraPathfinder.dijkstra
+        self._check_revision()
+        self.nodes_expanded = 0
+        if start == destination:
+            return 0, [start]
+        in_grid = all(0 <= p[0] < self.rows and 0 <= p[1] < self.cols for p in (start, destination))
+        if not in_grid or not self._is_open(start):
+            return float('inf'), []
+
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(destination)
+        start_targets = self.entrances(start_cluster)
+        if start_cluster == goal_cluster:
+            start_targets.add(destination)
+        start_costs, start_parents = self._cluster_search(start, start_cluster, start_targets)
+        goal_costs, goal_parents = self._cluster_search(destination, goal_cluster,
+                                                        self.entrances(goal_cluster), reverse=True)
+
+        def neighbors(node):
+            if node == start:
+                for target in start_targets:
+                    if target in start_costs and target != start:
+                        yield target, start_costs[target]
+            elif node in self._inter or node in goal_costs:
+                yield from self._intra_edges(self.cluster_of(node)).get(node, {}).items()
+            yield from self._inter.get(node, {}).items()
+            if node in goal_costs and node != destination:
+                yield destination, goal_costs[node]
+
+        h = self.pathfinder.make_heuristic('manhattan')
+        costs = {start: 0}
+        parents = {}
+        frontier = [(h(start, destination), 0, start)]
+        while frontier:
+            _, neg_cost, current = heapq.heappop(frontier)
+            cost = -neg_cost
+            if cost > costs[current]:
+                continue
+            if current == destination:
+                break
+            self.nodes_expanded += 1
+            for neighbor, step in neighbors(current):
+                new_cost = cost + step
+                if new_cost < costs.get(neighbor, float('inf')):
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = current
+                    heapq.heappush(frontier, (new_cost + h(neighbor, destination), -new_cost, neighbor))
+
+        if destination not in parents:
+            return float('inf'), []
+        waypoints = [destination]
+        while waypoints[-1] in parents:
+            waypoints.append(parents[waypoints[-1]])
+        waypoints.reverse()
+        return costs[destination], self._refine(waypoints, start_parents, goal_parents)
+
+    def _refine(self, waypoints, start_parents, goal_parents):
+        start, destination = waypoints[0], waypoints[-1]
+        path = [start]
+        for u, v in zip(waypoints, waypoints[1:]):
+            if self.cluster_of(u) != self.cluster_of(v):
+                # transition across a cluster border
+                path.append(v)
+            elif u == start:
+                segment = [v]
+                while segment[-1] != start:
+                    segment.append(start_parents[segment[-1]])
+                path.extend(reversed(segment[:-1]))
+            elif v == destination:
+                node = u
+                while node != destination:
+                    node = goal_parents[node]
+                    path.append(node)
+            else:
+                _, parents = self._cluster_search(u, self.cluster_of(u), {v})
+                segment = [v]
+                while segment[-1] != u:
+                    segment.append(parents[segment[-1]])
+                path.extend(reversed(segment[:-1]))
+        return path
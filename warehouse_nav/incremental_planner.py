@@ -0,0 +1,174 @@
+import heapq
+
+from .grid_graph import BACK_STEP_COST, DIRECTIONS
+from .warehouse_grid import WarehouseGrid
+
+INF = float('inf')
+
+
+class DStarLite:
+    # Incremental planner (D* Lite, Koenig & Likhachev 2002). It searches
+    # backwards from the goal and keeps g/rhs values between calls, so after
+    # update_cell() or move_to() only the part of the search the change
+    # touches is repaired on the next plan().
+    def __init__(self, grid, start, goal):
+        if not isinstance(grid, WarehouseGrid):
+            grid = WarehouseGrid.from_chars(grid)
+        self.grid = grid
+        self.rows = grid.rows
+        self.cols = grid.cols
+        self._cell_costs = memoryview(grid.costs.reshape(-1))
+        self._passable = memoryview(grid.passable.reshape(-1))
+        # cheapest down/right step under the cost model; up/left is always 0.5.
+        # With 'S' costing 0 this is 0, which keeps the heuristic consistent.
+        self._forward_step = max(min(list(grid.cost_map.values()) + [1]), 0)
+
+        self.start = start
+        self.goal = goal
+        self._last = start
+        self._km = 0
+        self._g = {}
+        self._rhs = {goal: 0}
+        self._open = {}
+        self._queue = []
+        self._push(goal)
+        self.nodes_expanded = 0
+
+    def heuristic(self, a, b):
+        # lower bound on the cost of going from a to b
+        dr = b[0] - a[0]
+        dc = b[1] - a[1]
+        back = max(-dr, 0) + max(-dc, 0)
+        forward = max(dr, 0) + max(dc, 0)
+        return back * BACK_STEP_COST + forward * self._forward_step
+
+    def cost(self, u, v):
+        # cost of the move u -> v, matching DijkstraPathfinder.get_cost
+        r, c = v
+        if not (0 <= r < self.rows and 0 <= c < self.cols) or not self._passable[r * self.cols + c]:
+            return INF
+        if r < u[0] or c < u[1]:
+            return BACK_STEP_COST
+        return self._cell_costs[r * self.cols + c]
+
+    def neighbors(self, pos):
+        r, c = pos
+        for dr, dc in DIRECTIONS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < self.rows and 0 <= nc < self.cols:
+                yield (nr, nc)
+
+    def move_to(self, pos):
+        # the robot advanced along its route; the search keeps its state
+        self.start = pos
+
+    def update_cell(self, r, c, cell):
+        changed = (r, c)
+        old = {u: self.cost(u, changed) for u in self.neighbors(changed)}
+        self.grid.set_cell(r, c, cell)
+        if all(self.cost(u, changed) == cost for u, cost in old.items()):
+            return
+
+        if self._last != self.start:
+            self._km += self.heuristic(self._last, self.start)
+            self._last = self.start
+
+        g_changed = self._g.get(changed, INF)
+        for u, old_cost in old.items():
+            new_cost = self.cost(u, changed)
+            if u != self.goal:
+                if old_cost > new_cost:
+                    self._rhs[u] = min(self._rhs.get(u, INF), new_cost + g_changed)
+                elif self._rhs.get(u, INF) == old_cost + g_changed:
+                    self._rhs[u] = self._best_successor(u)[0]
+            self._update_vertex(u)
+
+    def plan(self):
+        # (cost, path) from the current start to the goal, same shape as
+        # DijkstraPathfinder.dijkstra
+        if self.start == self.goal:
+            return 0, [self.start]
+        r, c = self.start
+        if not self._passable[r * self.cols + c]:
+            # like the other engines, nothing is expanded from a wall
+            return INF, []
+        self._compute_shortest_path()
+        cost = self._g.get(self.start, INF)
+        if cost == INF:
+            return INF, []
+
+        path = [self.start]
+        current = self.start
+        while current != self.goal:
+            _, current = self._best_successor(current)
+            if current is None or len(path) > self.rows * self.cols:
+                # g(start) is finite, so a route exists and the search is broken
+                raise RuntimeError(f"D* Lite lost the route from {self.start} to {self.goal}")
+            path.append(current)
+        return cost, path
+
+    def _best_successor(self, u):
+        best, best_node = INF, None
+        for v in self.neighbors(u):
+            total = self.cost(u, v) + self._g.get(v, INF)
+            if total < best:
+                best, best_node = total, v
+        return best, best_node
+
+    def _key(self, u):
+        best = min(self._g.get(u, INF), self._rhs.get(u, INF))
+        return (best + self.heuristic(self.start, u) + self._km, best)
+
+    def _push(self, u):
+        key = self._key(u)
+        self._open[u] = key
+        heapq.heappush(self._queue, (key, u))
+
+    def _update_vertex(self, u):
+        if self._g.get(u, INF) != self._rhs.get(u, INF):
+            self._push(u)
+        else:
+            self._open.pop(u, None)
+
+    def _top(self):
+        # drop heap entries that were re-keyed or removed since they were pushed
+        while self._queue:
+            key, u = self._queue[0]
+            if self._open.get(u) == key:
+                return key, u
+            heapq.heappop(self._queue)
+        return (INF, INF), None
+
+    def _compute_shortest_path(self):
+        self.nodes_expanded = 0
+        g, rhs = self._g, self._rhs
+        while True:
+            k_old, u = self._top()
+            if u is None:
+                break
+            start_key = self._key(self.start)
+            # the paper stops at k_old < start_key, which leaves nodes tied
+            # with the start inconsistent. Zero-cost 'S' moves make such ties
+            # common and plan() may walk into one and go in circles, so ties
+            # are settled too; then every node a cheapest step can reach is.
+            if not (k_old <= start_key or rhs.get(self.start, INF) != g.get(self.start, INF)):
+                break
+
+            self.nodes_expanded += 1
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._push(u)
+            elif g.get(u, INF) > rhs.get(u, INF):
+                g[u] = rhs[u]
+                del self._open[u]
+                for p in self.neighbors(u):
+                    if p != self.goal:
+                        rhs[p] = min(rhs.get(p, INF), self.cost(p, u) + g[u])
+                    self._update_vertex(p)
+            else:
+                g_old = g.get(u, INF)
+                g[u] = INF
+                for p in list(self.neighbors(u)) + [u]:
+                    if p != self.goal and (p == u or rhs.get(p, INF) == self.cost(p, u) + g_old):
+                        rhs[p] = self._best_successor(p)[0]
+                    self._update_vertex(p)
@@ -0,0 +1,145 @@
+import heapq
+
+import numpy as np
+
+from .grid_graph import BACK_STEP_COST, DIRECTIONS
+from .warehouse_grid import WarehouseGrid
+
+
+class JumpPointSearch:
+    # Jump point search for the 4-connected warehouse grid.
+    #
+    # Inside a region of plain floor every route between two cells with the
+    # same number of up/left and down/right moves costs the same, so the search
+    # only stops at jump points: cells with a forced neighbor around walls, the
+    # destination, and anything that breaks the symmetry. That is every cell
+    # whose entering cost differs from plain floor ('P', 'S', ...) plus the
+    # floor cells next to one. Those are expanded in all four directions like
+    # a normal Dijkstra/A* node, so priority lanes and the up/left discount are
+    # still priced exactly and the result stays optimal.
+    def __init__(self, grid, heuristic=None):
+        if not isinstance(grid, WarehouseGrid):
+            grid = WarehouseGrid.from_chars(grid)
+        self.grid = grid
+        self.rows = grid.rows
+        self.cols = grid.cols
+        self.heuristic = heuristic
+        self.nodes_expanded = 0
+        self._revision = None
+        self._prepare()
+
+    def _prepare(self):
+        grid = self.grid
+        floor_cost = grid.cost_map.get('.', 1)
+        uniform = grid.passable & (grid.costs == np.float32(floor_cost))
+        special = grid.passable & ~uniform
+        # floor cells touching a special cell have to stop every jump
+        near_special = special.copy()
+        near_special[1:, :] |= special[:-1, :]
+        near_special[:-1, :] |= special[1:, :]
+        near_special[:, 1:] |= special[:, :-1]
+        near_special[:, :-1] |= special[:, 1:]
+        self._floor_cost = float(floor_cost)
+        self._passable = memoryview(grid.passable.reshape(-1))
+        self._uniform = memoryview(uniform.reshape(-1))
+        self._stop = memoryview(near_special.reshape(-1))
+        self._cell_costs = memoryview(grid.costs.reshape(-1))
+        self._revision = grid.revision
+
+    def _open(self, r, c):
+        # plain floor inside the grid; special cells count as blocked here
+        return 0 <= r < self.rows and 0 <= c < self.cols and self._uniform[r * self.cols + c]
+
+    def _jump(self, r, c, dr, dc, goal):
+        # walk from (r, c) in direction (dr, dc) and return the first jump
+        # point, or None if the walk runs into a wall or the edge of the grid
+        cols = self.cols
+        while True:
+            if not (0 <= r < self.rows and 0 <= c < cols) or not self._passable[r * cols + c]:
+                return None
+            if (r, c) == goal or self._stop[r * cols + c]:
+                return r, c
+            if dc:
+                if (self._open(r - 1, c) and not self._open(r - 1, c - dc)) or \
+                        (self._open(r + 1, c) and not self._open(r + 1, c - dc)):
+                    return r, c
+            else:
+                if (self._open(r, c - 1) and not self._open(r - dr, c - 1)) or \
+                        (self._open(r, c + 1) and not self._open(r - dr, c + 1)):
+                    return r, c
+                # vertical runs stop wherever a horizontal run would find something
+                if self._jump(r, c + 1, 0, 1, goal) or self._jump(r, c - 1, 0, -1, goal):
+                    return r, c
+            r, c = r + dr, c + dc
+
+    def _successor_directions(self, node, parent):
+        r, c = node
+        if parent is None or self._stop[r * self.cols + c]:
+            return DIRECTIONS
+        dr = (r > parent[0]) - (r < parent[0])
+        dc = (c > parent[1]) - (c < parent[1])
+        if dc:
+            return [(-1, 0), (1, 0), (0, dc)]
+        return [(0, -1), (0, 1), (dr, 0)]
+
+    def _segment_cost(self, node, jump_point, dr, dc):
+        steps = abs(jump_point[0] - node[0]) + abs(jump_point[1] - node[1])
+        if dr < 0 or dc < 0:
+            return steps * BACK_STEP_COST
+        r, c = jump_point
+        # every cell before the jump point is plain floor
+        return (steps - 1) * self._floor_cost + self._cell_costs[r * self.cols + c]
+
+    def search(self, start, destination):
+        # (cost, path) like DijkstraPathfinder.dijkstra; the path lists every
+        # cell, not just the jump points
+        if self._revision != self.grid.revision:
+            self._prepare()
+        h = self.heuristic or (lambda pos, goal: 0)
+        self.nodes_expanded = 0
+
+        in_grid = 0 <= start[0] < self.rows and 0 <= start[1] < self.cols
+        if start == destination:
+            return 0, [start]
+        if not in_grid or not self._passable[start[0] * self.cols + start[1]]:
+            return float('inf'), []
+
+        costs = {start: 0}
+        parents = {}
+        frontier = [(h(start, destination), 0, start)]
+
+        while frontier:
+            _, neg_cost, current = heapq.heappop(frontier)
+            cost = -neg_cost
+            if cost > costs[current]:
+                continue
+            if current == destination:
+                break
+
+            self.nodes_expanded += 1
+            for dr, dc in self._successor_directions(current, parents.get(current)):
+                jump_point = self._jump(current[0] + dr, current[1] + dc, dr, dc, destination)
+                if jump_point is None:
+                    continue
+                new_cost = cost + self._segment_cost(current, jump_point, dr, dc)
+                if new_cost < costs.get(jump_point, float('inf')):
+                    costs[jump_point] = new_cost
+                    parents[jump_point] = current
+                    heapq.heappush(frontier, (new_cost + h(jump_point, destination), -new_cost, jump_point))
+
+        if destination not in parents:
+            return float('inf'), []
+        jump_points = [destination]
+        while jump_points[-1] in parents:
+            jump_points.append(parents[jump_points[-1]])
+        jump_points.reverse()
+
+        path = [start]
+        for r, c in jump_points[1:]:
+            pr, pc = path[-1]
+            dr = (r > pr) - (r < pr)
+            dc = (c > pc) - (c < pc)
+            while path[-1] != (r, c):
+                pr, pc = path[-1]
+                path.append((pr + dr, pc + dc))
+        return costs[destination], path
@@ -0,0 +1,190 @@
+import struct
+
+import numpy as np
+
+from .grid_graph import GridGraph
+from .hierarchical_planner import HierarchicalPlanner
+from .warehouse_grid import WarehouseGrid
+
+# Binary warehouse map (.map) layout, all little-endian:
+#
+#   header    magic, version, rows, cols, number of cell types, number of
+#             sections, byte offset of the cell array
+#   types     one (char, has_cost, cost) record per cell code
+#   sections  one (name, dtype, offset, count) record per optional array
+#   cells     rows * cols uint8 codes, row-major, at a 64-byte aligned offset
+#   arrays    the section payloads, each 64-byte aligned
+#
+# The cell array is read with np.memmap, so opening a large map does not parse
+# or copy anything. Optional sections hold the CSR adjacency of a GridGraph
+# and the entrance-to-entrance costs of a HierarchicalPlanner, which are the
+# slow parts to rebuild for a big site.
+MAGIC = b'WHMAP\0'
+VERSION = 1
+HEADER = struct.Struct('<6sHIIHHQ')
+TYPE_RECORD = struct.Struct('<cBd')
+SECTION_RECORD = struct.Struct('<8s4sQQ')
+ALIGN = 64
+
+GRAPH_SECTIONS = ('indptr', 'indices', 'weights')
+CLUSTER_SECTIONS = ('hpa_meta', 'hpa_ent', 'hpa_edge', 'hpa_cost')
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _graph_arrays(graph):
+    return {'indptr': graph.indptr, 'indices': graph.indices, 'weights': graph.weights}
+
+
+def _cluster_arrays(planner):
+    # entrance costs of every cluster the planner has filled in so far
+    entrances = {}
+    edges, costs = [], []
+    for cluster_edges in planner._intra.values():
+        for a, targets in cluster_edges.items():
+            for b, cost in targets.items():
+                for entrance in (a, b):
+                    entrances.setdefault(entrance, len(entrances))
+                edges.append((entrances[a], entrances[b]))
+                costs.append(cost)
+    clusters = sorted(planner._intra)
+    return {
+        # cluster_size, dense_entrances, then the (row, col) of every
+        # precomputed cluster, so clusters without entrances are kept too
+        'hpa_meta': np.array([planner.cluster_size, planner.dense_entrances] +
+                             [x for cluster in clusters for x in cluster], dtype=np.int64),
+        'hpa_ent': np.array(list(entrances), dtype=np.int32).reshape(-1, 2),
+        'hpa_edge': np.array(edges, dtype=np.int32).reshape(-1, 2),
+        'hpa_cost': np.array(costs, dtype=np.float64),
+    }
+
+
+def save_map(path, grid, graph=None, planner=None):
+    # grid is a WarehouseGrid or a list of lists of cell characters; graph and
+    # planner are optional precomputed structures for the same grid
+    if not isinstance(grid, WarehouseGrid):
+        grid = WarehouseGrid.from_chars(grid)
+    for name, structure in (('graph', graph), ('planner', planner)):
+        if structure is not None and (structure.rows, structure.cols) != grid.shape:
+            raise ValueError(f"The {name} was built for a different grid size")
+    arrays = {}
+    if graph is not None:
+        arrays.update(_graph_arrays(graph))
+    if planner is not None:
+        arrays.update(_cluster_arrays(planner))
+
+    types = b''
+    for cell in grid.cell_types:
+        cost = grid.cost_map.get(cell)
+        types += TYPE_RECORD.pack(cell.encode('latin-1'), cost is not None, 0 if cost is None else cost)
+    directory_size = len(arrays) * SECTION_RECORD.size
+    cells_offset = _aligned(HEADER.size + len(types) + directory_size)
+
+    offset = _aligned(cells_offset + grid.codes.nbytes)
+    directory = b''
+    layout = []
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        dtype = array.dtype.newbyteorder('<')
+        directory += SECTION_RECORD.pack(name.encode(), dtype.str.encode(), offset, array.size)
+        layout.append((offset, array.astype(dtype, copy=False)))
+        offset = _aligned(offset + array.nbytes)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, grid.rows, grid.cols, len(grid.cell_types), len(arrays), cells_offset))
+        f.write(types)
+        f.write(directory)
+        f.seek(cells_offset)
+        f.write(grid.codes.tobytes())
+        for offset, array in layout:
+            f.seek(offset)
+            f.write(array.tobytes())
+
+
+def read_header(path):
+    # (rows, cols, cell_types, cost_map, cells_offset, sections) where sections
+    # maps a section name to (dtype, offset, count)
+    with open(path, 'rb') as f:
+        head = f.read(HEADER.size)
+        if len(head) < HEADER.size or head[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a warehouse map file")
+        _, version, rows, cols, type_count, section_count, cells_offset = HEADER.unpack(head)
+        if version > VERSION:
+            raise ValueError(f"{path} uses map format version {version}, this code reads up to {VERSION}")
+
+        cell_types, cost_map = [], {}
+        for _ in range(type_count):
+            char, has_cost, cost = TYPE_RECORD.unpack(f.read(TYPE_RECORD.size))
+            cell = char.decode('latin-1')
+            cell_types.append(cell)
+            if has_cost:
+                cost_map[cell] = int(cost) if cost.is_integer() else cost
+
+        sections = {}
+        for _ in range(section_count):
+            name, dtype, offset, count = SECTION_RECORD.unpack(f.read(SECTION_RECORD.size))
+            sections[name.rstrip(b'\0').decode()] = (np.dtype(dtype.rstrip(b'\0').decode()), offset, count)
+    return rows, cols, cell_types, cost_map, cells_offset, sections
+
+
+def load_map(path, mmap=True):
+    # WarehouseGrid from a .map file. With mmap=True the cell codes are a
+    # copy-on-write memory map of the file: nothing is parsed, and edits stay
+    # in memory until the map is saved again.
+    rows, cols, cell_types, cost_map, cells_offset, _ = read_header(path)
+    if mmap:
+        codes = np.memmap(path, dtype=np.uint8, mode='c', offset=cells_offset, shape=(rows, cols))
+    else:
+        codes = np.fromfile(path, dtype=np.uint8, count=rows * cols, offset=cells_offset).reshape(rows, cols)
+    return WarehouseGrid(codes, cell_types, cost_map)
+
+
+def _read_sections(path, sections, names):
+    if not all(name in sections for name in names):
+        return None
+    arrays = {}
+    for name in names:
+        dtype, offset, count = sections[name]
+        arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,)) \
+            if count else np.zeros(0, dtype=dtype)
+    return arrays
+
+
+def load_graph(path):
+    # GridGraph from the adjacency section, or None if the file has none
+    rows, cols, _, _, _, sections = read_header(path)
+    arrays = _read_sections(path, sections, GRAPH_SECTIONS)
+    if arrays is None:
+        return None
+    passable = load_map(path).passable.reshape(-1)
+    return GridGraph.from_arrays(rows, cols, arrays['indptr'], arrays['indices'], arrays['weights'], passable)
+
+
+def load_planner(path, grid=None):
+    # HierarchicalPlanner with the saved entrance costs already filled in, or
+    # None if the file has no cluster section. grid defaults to load_map(path).
+    rows, cols, _, _, _, sections = read_header(path)
+    arrays = _read_sections(path, sections, CLUSTER_SECTIONS)
+    if arrays is None:
+        return None
+    if grid is None:
+        grid = load_map(path)
+    if grid.shape != (rows, cols):
+        raise ValueError(f"Map file is {rows}x{cols}, grid is {grid.rows}x{grid.cols}")
+
+    meta = arrays['hpa_meta'].tolist()
+    planner = HierarchicalPlanner(grid, cluster_size=meta[0], dense_entrances=bool(meta[1]))
+    clusters = [tuple(meta[i:i + 2]) for i in range(2, len(meta), 2)]
+    intra = {cluster: {} for cluster in clusters}
+    entrances = [tuple(pos) for pos in arrays['hpa_ent'].reshape(-1, 2).tolist()]
+    for (a, b), cost in zip(arrays['hpa_edge'].reshape(-1, 2).tolist(), arrays['hpa_cost'].tolist()):
+        a, b = entrances[a], entrances[b]
+        intra[planner.cluster_of(a)].setdefault(a, {})[b] = cost
+    for cluster in clusters:
+        # entrances with no reachable partner still need their (empty) entry
+        for entrance in planner.entrances(cluster):
+            intra[cluster].setdefault(entrance, {})
+    planner._intra.update(intra)
+    return planner
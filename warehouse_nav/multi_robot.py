@@ -0,0 +1,290 @@
+import heapq
+from collections import deque
+
+from .pathfinder import DijkstraPathfinder
+
+INF = float('inf')
+
+
+class ReservationTable:
+    # Space-time reservations for robots sharing a floor. Slot i of the deques
+    # holds the cells (and the moves starting) at time base_time + i, keyed by
+    # flat cell id, so memory grows with robots x horizon rather than with the
+    # map. advance(now) drops everything before now; with a horizon, nothing
+    # further than horizon steps past base_time is stored at all. A robot that
+    # reached its goal stays parked there until release(); reserve with
+    # parked=False only holds the cells for the times listed.
+    def __init__(self, horizon=None):
+        self.horizon = horizon
+        self.base_time = 0
+        self._cells = deque()
+        self._moves = deque()
+        self._parked = {}
+
+    def _slot(self, t):
+        while len(self._cells) <= t - self.base_time:
+            self._cells.append({})
+            self._moves.append({})
+        return t - self.base_time
+
+    def in_window(self, t):
+        return self.horizon is None or t < self.base_time + self.horizon
+
+    def reserve(self, robot, path, start_time=0, parked=True):
+        # path[i] is the cell id the robot occupies at start_time + i
+        for i, cell in enumerate(path):
+            t = start_time + i
+            if t < self.base_time:
+                continue
+            if not self.in_window(t):
+                break
+            slot = self._slot(t)
+            self._cells[slot][cell] = robot
+            if i + 1 < len(path) and self.in_window(t + 1):
+                self._moves[slot][(cell, path[i + 1])] = robot
+        if parked:
+            self._parked[path[-1]] = (robot, start_time + len(path) - 1)
+
+    def release(self, robot):
+        # forget every reservation robot holds, e.g. before replanning it
+        for cells, moves in zip(self._cells, self._moves):
+            for cell in [cell for cell, owner in cells.items() if owner == robot]:
+                del cells[cell]
+            for move in [move for move, owner in moves.items() if owner == robot]:
+                del moves[move]
+        for cell in [cell for cell, (owner, _) in self._parked.items() if owner == robot]:
+            del self._parked[cell]
+
+    def advance(self, now):
+        while self.base_time < now:
+            if self._cells:
+                self._cells.popleft()
+                self._moves.popleft()
+            self.base_time += 1
+
+    def owner(self, cell, t):
+        if t >= self.base_time and t - self.base_time < len(self._cells):
+            robot = self._cells[t - self.base_time].get(cell)
+            if robot is not None:
+                return robot
+        parked = self._parked.get(cell)
+        if parked is not None and t >= parked[1]:
+            return parked[0]
+        return None
+
+    # the three checks the space-time search asks, for robot `robot`
+
+    def blocked(self, robot, cell, t):
+        if not self.in_window(t):
+            return False
+        owner = self.owner(cell, t)
+        return owner is not None and owner != robot
+
+    def move_blocked(self, robot, a, b, t):
+        # somebody moving b -> a while we move a -> b would swap through us
+        if not self.in_window(t) or not (0 <= t - self.base_time < len(self._moves)):
+            return False
+        owner = self._moves[t - self.base_time].get((b, a))
+        return owner is not None and owner != robot
+
+    def busy_until(self, robot, cell):
+        # last time somebody else needs cell; inf if another robot parks there
+        parked = self._parked.get(cell)
+        if parked is not None and parked[0] != robot:
+            return INF
+        last = -1
+        for i, cells in enumerate(self._cells):
+            owner = cells.get(cell)
+            if owner is not None and owner != robot:
+                last = self.base_time + i
+        return last
+
+    def __len__(self):
+        return sum(len(cells) for cells in self._cells)
+
+
+class _Constraints:
+    # per-robot constraints of a conflict-based search node
+    def __init__(self, cells=(), moves=()):
+        self.cells = set(cells)
+        self.moves = set(moves)
+
+    def blocked(self, robot, cell, t):
+        return (cell, t) in self.cells
+
+    def move_blocked(self, robot, a, b, t):
+        return (a, b, t) in self.moves
+
+    def busy_until(self, robot, cell):
+        return max((t for c, t in self.cells if c == cell), default=-1)
+
+
+class MultiRobotPlanner:
+    # Plans many robots at once on one map with the DijkstraPathfinder cost
+    # model, so that no two robots are in the same cell at the same time or
+    # swap cells in one step. method='cooperative' plans robots one after the
+    # other against a shared ReservationTable (cooperative A*);
+    # method='cbs' runs conflict-based search, which minimises the summed cost
+    # but can take much longer with many interacting robots. Waiting in place
+    # costs wait_cost per step.
+    def __init__(self, grid, wait_cost=1, horizon=None, max_time=None):
+        self.pathfinder = DijkstraPathfinder(grid)
+        self.graph = self.pathfinder.graph
+        self.wait_cost = wait_cost
+        self.horizon = horizon
+        self.max_time = max_time if max_time is not None else 2 * self.graph.num_nodes
+        self.reservations = ReservationTable(horizon)
+        self.nodes_expanded = 0
+        self._heuristics = {}
+
+    def _costs_to(self, goal):
+        if goal not in self._heuristics:
+            self._heuristics[goal] = self.graph.costs_to(goal)
+        return self._heuristics[goal]
+
+    def plan(self, tasks, method='cooperative', start_time=0):
+        # tasks: [(start, goal), ...]; returns [(cost, path), ...] in the same
+        # order where path[t] is the robot's cell at start_time + t, or
+        # (inf, []) for a robot that could not be routed
+        tasks = [(self.graph.node_id(start), self.graph.node_id(goal)) for start, goal in tasks]
+        self.nodes_expanded = 0
+        if method == 'cooperative':
+            results = self._plan_cooperative(tasks, start_time)
+        elif method == 'cbs':
+            results = self._plan_cbs(tasks, start_time)
+        else:
+            raise ValueError(f"Unknown method: {method!r}")
+        return [(cost, [self.graph.position(cell) for cell in path]) for cost, path in results]
+
+    def _plan_cooperative(self, tasks, start_time):
+        results = [None] * len(tasks)
+        # robot ids are task indices, so reservations from an earlier plan()
+        # would belong to the wrong robots
+        self.reservations = ReservationTable(self.horizon)
+        self.reservations.advance(start_time)
+        # everybody's start cell is taken at start_time, and only then
+        for robot, (start, _) in enumerate(tasks):
+            self.reservations.reserve(robot, [start], start_time, parked=False)
+        pending = deque(range(len(tasks)))
+        while pending:
+            robot = pending.popleft()
+            start, goal = tasks[robot]
+            self.reservations.release(robot)
+            result = self._search(robot, start, goal, self.reservations, start_time)
+            results[robot] = result
+            if result[1]:
+                self.reservations.reserve(robot, result[1], start_time)
+                continue
+            # unroutable robots stay where they are, for good; robots already
+            # routed through that cell have to be planned around it again
+            self.reservations.reserve(robot, [start], start_time)
+            for other, planned in enumerate(results):
+                if other != robot and planned is not None and start in planned[1]:
+                    results[other] = None
+                    self.reservations.release(other)
+                    self.reservations.reserve(other, [tasks[other][0]], start_time, parked=False)
+                    pending.append(other)
+        return results
+
+    def _plan_cbs(self, tasks, start_time, max_nodes=10000):
+        constraints = [_Constraints() for _ in tasks]
+        paths = [self._search(robot, start, goal, constraints[robot], start_time)
+                 for robot, (start, goal) in enumerate(tasks)]
+        if any(not path for _, path in paths):
+            return paths
+        counter = 0
+        frontier = [(sum(cost for cost, _ in paths), counter, constraints, paths)]
+        while frontier and counter < max_nodes:
+            _, _, constraints, paths = heapq.heappop(frontier)
+            conflict = self._first_conflict([path for _, path in paths])
+            if conflict is None:
+                return paths
+            for robot, cell_constraint, move_constraint in conflict:
+                child = list(constraints)
+                child[robot] = _Constraints(constraints[robot].cells, constraints[robot].moves)
+                # conflicts count time from the plan start, _search in
+                # absolute time
+                if cell_constraint:
+                    cell, t = cell_constraint
+                    child[robot].cells.add((cell, start_time + t))
+                if move_constraint:
+                    a, b, t = move_constraint
+                    child[robot].moves.add((a, b, start_time + t))
+                start, goal = tasks[robot]
+                replanned = self._search(robot, start, goal, child[robot], start_time)
+                if not replanned[1]:
+                    continue
+                child_paths = list(paths)
+                child_paths[robot] = replanned
+                counter += 1
+                heapq.heappush(frontier, (sum(cost for cost, _ in child_paths), counter, child, child_paths))
+        raise RuntimeError(f"Conflict-based search gave up after {counter} nodes")
+
+    @staticmethod
+    def _first_conflict(paths):
+        # [(robot, (cell, t) or None, (a, b, t) or None), ...] for both robots
+        # of the earliest vertex or swap conflict; t counts from the plan start
+        horizon = max(len(path) for path in paths)
+
+        def at(path, t):
+            return path[min(t, len(path) - 1)]
+
+        for t in range(horizon):
+            seen = {}
+            for robot, path in enumerate(paths):
+                cell = at(path, t)
+                if cell in seen:
+                    return [(seen[cell], (cell, t), None), (robot, (cell, t), None)]
+                seen[cell] = robot
+            for i in range(len(paths)):
+                for j in range(i + 1, len(paths)):
+                    a0, a1 = at(paths[i], t), at(paths[i], t + 1)
+                    b0, b1 = at(paths[j], t), at(paths[j], t + 1)
+                    if a0 == b1 and a1 == b0 and a0 != a1:
+                        return [(i, None, (a0, a1, t)), (j, None, (b0, b1, t))]
+        return None
+
+    def _search(self, robot, start, goal, blocked, start_time):
+        # space-time A* from (start, start_time); the heuristic is the exact
+        # cost to goal ignoring other robots. Returns (cost, [cell per step]).
+        h = self._costs_to(goal)
+        # the goal has to stay free from arrival on; if another robot parks
+        # there for good no amount of waiting helps
+        goal_busy = blocked.busy_until(robot, goal)
+        if h[start] == INF or goal_busy == INF:
+            return INF, []
+        indptr, indices, weights = self.graph._indptr, self.graph._indices, self.graph._weights
+        wait_cost = self.wait_cost
+        begin = (start, start_time)
+        costs = {begin: 0}
+        parents = {}
+        frontier = [(h[start], 0, start_time, start)]
+
+        while frontier:
+            _, cost, t, cell = heapq.heappop(frontier)
+            if cost > costs[(cell, t)]:
+                continue
+            if cell == goal and goal_busy < t:
+                path = [cell]
+                state = (cell, t)
+                while state in parents:
+                    state = parents[state]
+                    path.append(state[0])
+                path.reverse()
+                return cost, path
+            if t - start_time >= self.max_time:
+                continue
+            self.nodes_expanded += 1
+
+            moves = [(indices[i], weights[i]) for i in range(indptr[cell], indptr[cell + 1])]
+            moves.append((cell, wait_cost))
+            for neighbor, step in moves:
+                if blocked.blocked(robot, neighbor, t + 1) or blocked.move_blocked(robot, cell, neighbor, t):
+                    continue
+                state = (neighbor, t + 1)
+                new_cost = cost + step
+                if new_cost < costs.get(state, INF):
+                    costs[state] = new_cost
+                    parents[state] = (cell, t)
+                    heapq.heappush(frontier, (new_cost + h[neighbor], new_cost, t + 1, neighbor))
+        return INF, []
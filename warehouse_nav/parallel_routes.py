@@ -0,0 +1,94 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .grid_graph import GridGraph
+
+# set in each worker by _init_worker
+_worker_graph = None
+_worker_blocks = []
+
+
+def _share(array):
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    _worker_blocks.append(block)
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _init_worker(rows, cols, specs):
+    global _worker_graph
+    indptr, indices, weights, passable = (_attach(spec) for spec in specs)
+    _worker_graph = GridGraph.from_arrays(rows, cols, indptr, indices, weights, passable)
+
+
+def _solve_group(task):
+    start, queries = task
+    results = _worker_graph.routes_from(start, [destination for _, destination in queries])
+    return [(i, result) for (i, _), result in zip(queries, results)]
+
+
+class ParallelRouter:
+    # Answers batches of (start, destination) queries on a process pool. The
+    # CSR graph is built once here and placed in shared memory; workers attach
+    # to it at startup instead of receiving the grid with every task. Use as a
+    # context manager, or call close() when done.
+    def __init__(self, grid, processes=None, graph=None):
+        self.graph = graph if graph is not None else GridGraph(grid)
+        self._blocks = []
+        specs = []
+        for array in (self.graph.indptr, self.graph.indices, self.graph.weights, self.graph.passable):
+            block, spec = _share(array)
+            self._blocks.append(block)
+            specs.append(spec)
+        self._pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                          initargs=(self.graph.rows, self.graph.cols, specs))
+
+    def iter_routes(self, pairs, ordered=True):
+        # yields (index, (cost, path)) per pair; ordered=True streams them in
+        # submission order, ordered=False as soon as each worker finishes.
+        # Queries sharing a start go to the same worker and share one search.
+        by_start = {}
+        for i, (start, destination) in enumerate(pairs):
+            by_start.setdefault(start, []).append((i, destination))
+        tasks = list(by_start.items())
+
+        done = self._pool.imap_unordered(_solve_group, tasks)
+        if not ordered:
+            for group in done:
+                yield from group
+            return
+
+        pending = {}
+        next_index = 0
+        for group in done:
+            pending.update(group)
+            while next_index in pending:
+                yield next_index, pending.pop(next_index)
+                next_index += 1
+
+    def route_many(self, pairs):
+        return [result for _, result in self.iter_routes(pairs)]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,438 @@
+import heapq
+import math
+import time
+
+import numpy as np
+
+from .distance_field import DistanceField
+from .grid_graph import GridGraph
+from .jump_point_search import JumpPointSearch
+from .search_stats import SearchStats
+from .tiled_grid import TiledGrid
+from .warehouse_grid import WarehouseGrid
+
+
+class DijkstraPathfinder:
+    def __init__(self, grid):
+        # grid is a WarehouseGrid, a TiledGrid or a list of lists of cell
+        # characters
+        if not isinstance(grid, (WarehouseGrid, TiledGrid)):
+            grid = WarehouseGrid.from_chars(grid, {
+                '.': 1,
+                'P': 0.5,
+                'S': 0,
+                'D': 1
+            })
+        self.grid = grid
+        self.rows = grid.rows
+        self.cols = grid.cols
+        self.directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        self.cost_map = grid.cost_map
+        # flat views so the search loop reads plain Python floats/bools; on a
+        # TiledGrid they read through the tile store (overlays included), so
+        # the heap and A* searches never build a dense copy of the map
+        if isinstance(grid, TiledGrid):
+            self._cell_costs = grid.flat_costs()
+            self._passable = grid.flat_passable()
+        else:
+            self._cell_costs = memoryview(grid.costs.reshape(-1))
+            self._passable = memoryview(grid.passable.reshape(-1))
+        self._dense = None
+        self._scan_order = None
+        self._graph = None
+        self._graph_revision = None
+        self._jump_points = None
+        # filled in by every dijkstra()/astar() call so callers can compare engines
+        self.nodes_expanded = 0
+        self._zero_cost_cells = None
+        # opt-in instrumentation: with collect_stats on, or an on_expand(pos,
+        # cost) callback set, every query leaves a SearchStats in self.stats
+        self.collect_stats = False
+        self.on_expand = None
+        self.stats = None
+
+    @property
+    def graph(self):
+        # built on first use and kept, so one pathfinder can answer many
+        # queries on a static layout without redoing neighbor/cost work;
+        # rebuilt if the grid was edited since
+        if self._graph is None or self._graph_revision != self.grid.revision:
+            self._graph = GridGraph(self.dense_grid())
+            self._graph_revision = self.grid.revision
+        return self._graph
+
+    def dense_grid(self):
+        # the WarehouseGrid the CSR, scan and jump point engines work on: the
+        # grid itself, or for a TiledGrid a dense snapshot of it that is
+        # rebuilt after edits
+        if isinstance(self.grid, WarehouseGrid):
+            return self.grid
+        if self._dense is None or self._dense[0] != self.grid.revision:
+            self._dense = (self.grid.revision, self.grid.to_grid())
+        return self._dense[1]
+
+    def get_cost(self, current, neighbor, direction):
+        # Reduce cost if moving up or left
+        if direction in [(-1, 0), (0, -1)]:
+            return 0.5
+        r, c = neighbor
+        return self._cell_costs[r * self.cols + c]
+
+    def is_passable(self, pos):
+        r, c = pos
+        return 0 <= r < self.rows and 0 <= c < self.cols and self._passable[r * self.cols + c]
+
+    def get_neighbors(self, r, c):
+        for dr, dc in self.directions:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < self.rows and 0 <= nc < self.cols and self._passable[nr * self.cols + nc]:
+                yield (nr, nc), (dr, dc)
+
+    def dijkstra(self, start, destination, engine='heap', scan_ties=False):
+        # engine='heap' is the default; engine='csr' runs the same search over
+        # the precomputed self.graph and engine='scan' keeps the original
+        # O(V^2) min() scan around as a reference. heap and csr settle
+        # equal-cost cells in (cost, (r, c)) order, so they return the same
+        # cost and path; the scan returns the same cost, but may pick another
+        # path of that cost. scan_ties=True makes the heap break ties exactly
+        # like the scan, at the price of indexing every open cell first.
+        if engine not in ('heap', 'csr', 'scan'):
+            raise ValueError(f"Unknown engine: {engine!r}")
+        self.nodes_expanded = 0
+        stats = self._begin_stats(engine)
+        try:
+            if engine == 'csr':
+                result = self.graph.route(start, destination)
+                self.nodes_expanded = self.graph.nodes_expanded
+                return result
+            if engine == 'heap':
+                costs, parents = self._dijkstra_heap(start, destination, scan_ties)
+            else:
+                costs, parents = self._dijkstra_scan(start, destination)
+            return self.reconstruct_path(start, destination, costs, parents)
+        finally:
+            if stats is not None:
+                self._end_stats(stats)
+
+    def _begin_stats(self, engine):
+        if not self.collect_stats and self.on_expand is None:
+            self.stats = None
+            return None
+        stats = SearchStats(engine, self.on_expand)
+        if self.collect_stats:
+            # shadow the methods on the instance for the length of the query
+            self.get_neighbors = stats.timed_neighbors(DijkstraPathfinder.get_neighbors.__get__(self))
+            self.get_cost = stats.timed_cost(DijkstraPathfinder.get_cost.__get__(self))
+        if engine == 'csr':
+            self.graph.tracer = stats
+        stats.total_time = time.perf_counter()
+        self.stats = stats
+        return stats
+
+    def _end_stats(self, stats):
+        stats.total_time = time.perf_counter() - stats.total_time
+        self.__dict__.pop('get_neighbors', None)
+        self.__dict__.pop('get_cost', None)
+        if self._graph is not None:
+            self._graph.tracer = None
+        stats.nodes_expanded = self.nodes_expanded
+
+    def _open_cells(self):
+        # every open cell, inserted row by row like the original code did
+        return set(map(tuple, np.argwhere(self.dense_grid().passable).tolist()))
+
+    def tie_order(self, scan_ties=False):
+        # flat cell id -> rank the heap engine breaks cost ties on. By default
+        # that is the flat id itself, which costs nothing. With scan_ties it is
+        # the position of the cell in the scan engine's set, whose iteration
+        # order decides which of the cheapest cells min() picks; that means a
+        # set of every open cell, built once per grid revision, so it is only
+        # for checking the heap against the scan. A TiledGrid always uses
+        # position order.
+        if not scan_ties or isinstance(self.grid, TiledGrid):
+            return range(self.rows * self.cols)
+        if self._scan_order is None or self._scan_order[0] != self.grid.revision:
+            cells = [r * self.cols + c for r, c in self._open_cells()]
+            order = np.zeros(self.rows * self.cols, dtype=np.int64)
+            order[cells] = np.arange(len(cells))
+            self._scan_order = (self.grid.revision, memoryview(order))
+        return self._scan_order[1]
+
+    def _dijkstra_heap(self, start, destination, scan_ties=False):
+        costs = {start: 0}
+        parents = {}
+        for _ in self._heap_steps(start, destination, costs, parents, self.tie_order(scan_ties), self.stats):
+            pass
+        return costs, parents
+
+    def _heap_steps(self, start, destination, costs, parents, order, stats):
+        # the heap engine's loop, shared by dijkstra() and search_steps(). Fills
+        # costs and parents and yields (cell, pushed) after every expansion.
+        # Only cells that have been reached are stored; outdated heap entries
+        # are skipped when popped (lazy deletion).
+        visited = set()
+        cols = self.cols
+        frontier = [(0, order[start[0] * cols + start[1]], start)] if self.is_passable(start) else []
+        if stats is not None:
+            stats.heap_pushes = len(frontier)
+
+        while frontier:
+            cost, _, current = heapq.heappop(frontier)
+            if current in visited:
+                continue
+            if current == destination:
+                break
+
+            visited.add(current)
+            self.nodes_expanded += 1
+            r, c = current
+            pushed = []
+
+            for neighbor, direction in self.get_neighbors(r, c):
+                if neighbor in visited:
+                    continue
+                new_cost = cost + self.get_cost(current, neighbor, direction)
+                if new_cost < costs.get(neighbor, float('inf')):
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = current
+                    heapq.heappush(frontier, (new_cost, order[neighbor[0] * cols + neighbor[1]], neighbor))
+                    pushed.append(neighbor)
+                    if stats is not None:
+                        stats.edges_relaxed += 1
+                        stats.heap_pushes += 1
+            if stats is not None:
+                stats.expanded(current, cost, len(frontier))
+            yield current, pushed
+
+    def search_steps(self, start, destination):
+        # the heap engine as a generator, for callers that want to interleave
+        # the search with other work (the editor draws it live). Yields
+        # (cell, pushed) after every expansion, pushed being the neighbors
+        # that went onto the frontier, and returns the same (cost, path) as
+        # dijkstra(). No setup beyond the search itself, so the first step is
+        # as cheap as any other. Abandon it with close().
+        self.nodes_expanded = 0
+        costs = {start: 0}
+        parents = {}
+        yield from self._heap_steps(start, destination, costs, parents, self.tie_order(), None)
+        return self.reconstruct_path(start, destination, costs, parents)
+
+    def _dijkstra_scan(self, start, destination):
+        unvisited = self._open_cells()
+        costs = {pos: float('inf') for pos in unvisited}
+        parents = {}
+        costs[start] = 0
+        stats = self.stats
+
+        while unvisited:
+            current = min(unvisited, key=lambda pos: costs[pos])
+            if current == destination:
+                break
+
+            unvisited.remove(current)
+            self.nodes_expanded += 1
+            r, c = current
+
+            for neighbor, direction in self.get_neighbors(r, c):
+                if neighbor not in unvisited:
+                    continue
+                new_cost = costs[current] + self.get_cost(current, neighbor, direction)
+                if new_cost < costs[neighbor]:
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = current
+                    if stats is not None:
+                        stats.edges_relaxed += 1
+            if stats is not None:
+                # the scan engine's frontier is every cell it has not settled
+                stats.expanded(current, costs[current], len(unvisited))
+
+        return costs, parents
+
+    def distance_field(self, source):
+        # one full search from source; the returned DistanceField rebuilds the
+        # path to any destination without searching again
+        if not self.graph.in_bounds(source):
+            raise ValueError(f"Source {source} is outside the grid")
+        node = self.graph.node_id(source)
+        costs, parents = self.graph.dijkstra(node)
+        self.nodes_expanded = self.graph.nodes_expanded
+        return DistanceField.from_search(self.graph, source, costs, parents)
+
+    def route_many(self, pairs):
+        # (cost, path) for every (start, destination) pair, in input order
+        pairs = list(pairs)
+        results = [None] * len(pairs)
+        for i, result in self.iter_routes(pairs):
+            results[i] = result
+        return results
+
+    def iter_routes(self, pairs):
+        # yields (index, (cost, path)) per pair as soon as its start's search is
+        # done. Pairs are grouped by start so each distinct start is searched
+        # once, until all of its destinations are settled.
+        by_start = {}
+        for i, (start, destination) in enumerate(pairs):
+            by_start.setdefault(start, []).append((i, destination))
+
+        self.nodes_expanded = 0
+        for start, queries in by_start.items():
+            results = self.graph.routes_from(start, [destination for _, destination in queries])
+            self.nodes_expanded += self.graph.nodes_expanded
+            for (i, _), result in zip(queries, results):
+                yield i, result
+
+    def bidirectional(self, start, destination, astar=False):
+        # bidirectional Dijkstra (or A* with astar=True) over self.graph and its
+        # reversed edges; same cost as dijkstra(), the path may be a different
+        # one of equal cost
+        graph = self.graph
+        if not (graph.in_bounds(start) and graph.in_bounds(destination)):
+            self.nodes_expanded = 0
+            return (0, [start]) if start == destination else (float('inf'), [])
+        result = graph.bidirectional(graph.node_id(start), graph.node_id(destination), astar)
+        self.nodes_expanded = graph.nodes_expanded
+        return result
+
+    def jump_point_search(self, start, destination, heuristic='manhattan'):
+        # A* that jumps over runs of plain floor; same cost as dijkstra()
+        if self._jump_points is None or self._jump_points.grid is not self.dense_grid():
+            self._jump_points = JumpPointSearch(self.dense_grid())
+        self._jump_points.heuristic = heuristic if callable(heuristic) else self.make_heuristic(heuristic)
+        result = self._jump_points.search(start, destination)
+        self.nodes_expanded = self._jump_points.nodes_expanded
+        return result
+
+    def astar(self, start, destination, heuristic='manhattan'):
+        # heuristic is 'manhattan', 'octile', 'zero' or a callable(pos, destination)
+        # returning a lower bound on the remaining cost
+        h = heuristic if callable(heuristic) else self.make_heuristic(heuristic)
+
+        self.nodes_expanded = 0
+        stats = self._begin_stats('astar')
+        try:
+            return self._astar(start, destination, h, stats)
+        finally:
+            if stats is not None:
+                self._end_stats(stats)
+
+    def _astar(self, start, destination, h, stats):
+        costs = {start: 0}
+        parents = {}
+        frontier = [(h(start, destination), 0, start)] if self.is_passable(start) else []
+        if stats is not None:
+            stats.heap_pushes = len(frontier)
+
+        while frontier:
+            _, neg_cost, current = heapq.heappop(frontier)
+            cost = -neg_cost
+            if cost > costs[current]:
+                continue
+            if current == destination:
+                break
+
+            self.nodes_expanded += 1
+            r, c = current
+
+            for neighbor, direction in self.get_neighbors(r, c):
+                new_cost = cost + self.get_cost(current, neighbor, direction)
+                if new_cost < costs.get(neighbor, float('inf')):
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = current
+                    # ties on f go to the deeper node, it is closer to the goal
+                    heapq.heappush(frontier, (new_cost + h(neighbor, destination), -new_cost, neighbor))
+                    if stats is not None:
+                        stats.edges_relaxed += 1
+                        stats.heap_pushes += 1
+            if stats is not None:
+                stats.expanded(current, cost, len(frontier))
+
+        return self.reconstruct_path(start, destination, costs, parents)
+
+    def make_heuristic(self, kind):
+        # admissible lower bound h(pos, destination) for the current grid
+        if kind not in ('manhattan', 'octile', 'zero'):
+            raise ValueError(f"Unknown heuristic: {kind!r}")
+        if kind == 'zero':
+            return lambda pos, destination: 0
+
+        # cheapest step in each direction under get_cost: up/left always costs
+        # 0.5, down/right costs whatever the entered cell costs (1 if unknown)
+        back_step = 0.5
+        forward_step = min([cost for cost in self.cost_map.values() if cost > 0] + [1])
+        if isinstance(self.grid, TiledGrid):
+            # overlays can be cheaper than any cell type
+            overlay_costs = [overlay[4] for overlay in self.grid.overlays().values() if overlay[4]]
+            forward_step = min([forward_step] + overlay_costs)
+        # zero cost cells ('S') make a down/right step free, but a shortest path
+        # enters each of them at most once
+        if self._zero_cost_cells is None or self._zero_cost_cells[0] != self.grid.revision:
+            if isinstance(self.grid, TiledGrid):
+                count = self.grid.count_free_cells()
+            else:
+                count = int(np.count_nonzero((self.grid.costs <= 0) & self.grid.passable))
+            self._zero_cost_cells = (self.grid.revision, count)
+        free_steps = self._zero_cost_cells[1]
+
+        def axis_costs(pos, destination):
+            dr = destination[0] - pos[0]
+            dc = destination[1] - pos[1]
+            vertical = abs(dr) * (forward_step if dr > 0 else back_step)
+            horizontal = abs(dc) * (forward_step if dc > 0 else back_step)
+            free = min(free_steps, max(dr, 0) + max(dc, 0)) * forward_step
+            return vertical, horizontal, free
+
+        if kind == 'manhattan':
+            def manhattan(pos, destination):
+                vertical, horizontal, free = axis_costs(pos, destination)
+                return vertical + horizontal - free
+            return manhattan
+
+        # moves are 4-connected so octile is never larger than manhattan; it is
+        # still admissible, just less informed
+        def octile(pos, destination):
+            vertical, horizontal, free = axis_costs(pos, destination)
+            return max(max(vertical, horizontal) + (math.sqrt(2) - 1) * min(vertical, horizontal) - free, 0)
+        return octile
+
+    def reconstruct_path(self, start, destination, costs, parents):
+        path = []
+        cur = destination
+        while cur in parents:
+            path.append(cur)
+            cur = parents[cur]
+        if cur == start:
+            path.append(start)
+            path.reverse()
+            return costs[destination], path
+        else:
+            return float('inf'), []
+
+
+def find_start_end(grid):
+    if isinstance(grid, WarehouseGrid):
+        starts, ends = grid.find('S'), grid.find('D')
+        return (starts[-1] if starts else None), (ends[-1] if ends else None)
+    start = end = None
+    for r in range(len(grid)):
+        for c in range(len(grid[0])):
+            if grid[r][c] == 'S':
+                start = (r, c)
+            elif grid[r][c] == 'D':
+                end = (r, c)
+    return start, end
+
+
+def print_grid_with_path(grid, path):
+    if isinstance(grid, WarehouseGrid):
+        grid = grid.to_chars()
+    # grid copy to append path
+    grid_with_path = [row.copy() for row in grid]
+
+    for (r, c) in path:
+        if grid_with_path[r][c] not in ('S', 'D'):
+            grid_with_path[r][c] = '*'
+
+    print("Grid with Path:")
+    for row in grid_with_path:
+        print(' '.join(row))
+    print()
@@ -0,0 +1,62 @@
+import numpy as np
+
+from .warehouse_grid import WarehouseGrid
+
+# above this many cells the per-cell labels and grid lines are left out and
+# the path is drawn as a line; they would be unreadable and take minutes
+LABEL_LIMIT = 50 * 50
+# value imshow shows for each cell type; anything else is 0
+PLOT_VALUES = {'S': 2, 'D': 3, 'X': 1, 'P': 0.5}
+
+
+def grid_path_visualization(grid, path, save_path=None, labels=None):
+    # save_path writes a PNG without opening a window (works headless);
+    # labels=None labels cells only on maps up to LABEL_LIMIT cells.
+    # matplotlib is imported here, on first use, so the package itself
+    # stays cheap to import
+    from matplotlib.colors import to_rgba
+    from matplotlib.figure import Figure
+
+    if not isinstance(grid, WarehouseGrid):
+        grid = WarehouseGrid.from_chars(grid)
+    rows, cols = grid.shape
+    if labels is None:
+        labels = rows * cols <= LABEL_LIMIT
+    plot_grid = np.array([PLOT_VALUES.get(cell, 0) for cell in grid.cell_types])[grid.codes]
+
+    if save_path is not None:
+        fig = Figure(figsize=(8, 8))
+        ax = fig.subplots()
+    else:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=(8, 8))
+    ax.imshow(plot_grid, cmap='gray', interpolation='nearest')
+
+    if labels:
+        ax.set_xticks(np.arange(-0.5, cols, 1), minor=True)
+        ax.set_yticks(np.arange(-0.5, rows, 1), minor=True)
+        ax.grid(which='minor', color='black', linestyle='-', linewidth=2)
+
+        chars = grid.to_chars()
+        for r in range(rows):
+            for c in range(cols):
+                cell = chars[r][c]
+                if cell in ['S', 'D']:
+                    ax.text(c, r, cell, ha='center', va='center', color='blue', fontsize=12)
+                else:
+                    ax.text(c, r, cell, ha='center', va='center', color='white', fontsize=12)
+
+    if path:
+        path_r, path_c = np.array(path).T
+        if labels:
+            # one RGBA layer instead of a Rectangle patch per path cell
+            overlay = np.zeros((rows, cols, 4))
+            overlay[path_r, path_c] = to_rgba('green', 0.5)
+            ax.imshow(overlay, interpolation='nearest')
+        else:
+            ax.plot(path_c, path_r, color='green', linewidth=1.5)
+
+    if save_path is not None:
+        fig.savefig(save_path, dpi=100)
+    else:
+        plt.show()
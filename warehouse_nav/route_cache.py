@@ -0,0 +1,142 @@
+from collections import OrderedDict
+
+from .pathfinder import DijkstraPathfinder
+
+# rough in-memory size of a cached path, per entry and per (r, c) step
+ROUTE_ENTRY_BYTES = 200
+PATH_STEP_BYTES = 72
+
+
+class RouteCache:
+    # LRU cache of routes and distance fields in front of a DijkstraPathfinder.
+    # Every entry is valid for the grid at self.revision. Edits made through
+    # set_cell() only drop the entries the edited cell can affect; if the grid
+    # is edited any other way the whole cache is flushed on the next lookup.
+    def __init__(self, grid, max_bytes=64 * 1024 * 1024):
+        self.pathfinder = DijkstraPathfinder(grid)
+        self.grid = self.pathfinder.grid
+        self.revision = self.grid.revision
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        # ('route', start, destination) or ('field', source, None) -> (value, size)
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def route(self, start, destination):
+        self._check_revision()
+        key = ('route', start, destination)
+        if key in self._entries:
+            return self._hit(key)
+        self.misses += 1
+
+        field_key = ('field', start, None)
+        if field_key in self._entries:
+            self._entries.move_to_end(field_key)
+            result = self._entries[field_key][0].path_to(destination)
+        else:
+            result = self.pathfinder.dijkstra(start, destination, engine='csr')
+        self._store(key, result, ROUTE_ENTRY_BYTES + PATH_STEP_BYTES * len(result[1]))
+        return result
+
+    def cached_route(self, start, destination):
+        # the cached (cost, path) or None, without searching on a miss
+        self._check_revision()
+        key = ('route', start, destination)
+        return self._hit(key) if key in self._entries else None
+
+    def add_route(self, start, destination, result):
+        # store a route the caller searched for itself on the current grid
+        self._check_revision()
+        key = ('route', start, destination)
+        if key not in self._entries:
+            self._store(key, result, ROUTE_ENTRY_BYTES + PATH_STEP_BYTES * len(result[1]))
+
+    def distance_field(self, source):
+        self._check_revision()
+        key = ('field', source, None)
+        if key in self._entries:
+            return self._hit(key)
+        self.misses += 1
+
+        field = self.pathfinder.distance_field(source)
+        self._store(key, field, ROUTE_ENTRY_BYTES + field.costs.nbytes + field.parent_moves.nbytes)
+        return field
+
+    def set_cell(self, r, c, cell):
+        self._check_revision()
+        was_open = self.grid.is_open(r, c)
+        old_cost = self.grid.cost(r, c)
+        self.grid.set_cell(r, c, cell)
+        if self.grid.revision == self.revision:
+            return
+        self.revision = self.grid.revision
+
+        is_open = self.grid.is_open(r, c)
+        new_cost = self.grid.cost(r, c)
+        improved = is_open and (not was_open or new_cost < old_cost)
+        worsened = was_open and (not is_open or new_cost > old_cost)
+        if not (improved or worsened):
+            return
+
+        bound = self.pathfinder.make_heuristic('manhattan') if improved else None
+        for key in list(self._entries):
+            if self._affected(key, (r, c), improved, bound):
+                _, size = self._entries.pop(key)
+                self.size -= size
+                self.invalidated += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _affected(self, key, cell, improved, bound):
+        kind, start, destination = key
+        value = self._entries[key][0]
+        r, c = cell
+
+        if kind == 'route':
+            cost, path = value
+            if cell in path:
+                return True
+            if not improved:
+                # everything off the path only got more expensive
+                return False
+            # a cheaper or newly open cell only matters if a route through it
+            # could beat the cached cost
+            return bound(start, cell) + bound(cell, destination) < cost
+
+        reached = value.costs
+        if reached[r, c] != float('inf'):
+            return True
+        if not improved:
+            return False
+        # an unreached cell that opened up only matters next to reached ones
+        for dr, dc in self.pathfinder.directions:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < self.grid.rows and 0 <= nc < self.grid.cols and reached[nr, nc] != float('inf'):
+                return True
+        return False
+
+    def _check_revision(self):
+        if self.grid.revision != self.revision:
+            self.clear()
+            self.revision = self.grid.revision
+
+    def _hit(self, key):
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def _store(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
@@ -0,0 +1,241 @@
+# Long-running route service for fleet managers. Clients connect over
+# localhost TCP or a Unix socket and send one JSON request per line:
+#
+#   {"id": 7, "start": [0, 0], "destination": [9, 9]}
+#
+# and get one JSON line back per request, in the order they finish:
+#
+#   {"id": 7, "cost": 12.5, "path": [[0, 0], [0, 1], ...]}
+#   {"id": 8, "cost": null, "path": []}          no route
+#   {"id": 9, "error": "..."}                    malformed or off the map
+#
+# Run it from the repository root with a map saved by map_format.save_map:
+#   python -m warehouse_nav.route_service site.map --port 8765
+#   python -m warehouse_nav.route_service site.map --socket /tmp/routes.sock --processes 4
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .map_format import load_map
+from .parallel_routes import ParallelRouter
+from .pathfinder import DijkstraPathfinder
+
+
+class RouteService:
+    # The map is loaded and its CSR graph built once, here. Requests from all
+    # connections are collected for up to `window` seconds (or max_batch
+    # requests), then the batch runs on the worker pool: a ParallelRouter
+    # process pool, or with processes=0 the graph in this process. Batches run
+    # on helper threads so the event loop keeps accepting and answering
+    # requests, and each result is sent back as soon as it is known.
+    def __init__(self, grid, processes=None, window=0.005, max_batch=256, concurrent_batches=2):
+        self.window = window
+        self.max_batch = max_batch
+        if processes == 0:
+            self.router = None
+            self.graph = DijkstraPathfinder(grid).graph
+        else:
+            self.router = ParallelRouter(grid, processes)
+            self.graph = self.router.graph
+        self.rows, self.cols = self.graph.rows, self.graph.cols
+        self._executor = ThreadPoolExecutor(concurrent_batches)
+        self._queue = None
+        self._batcher = None
+        self.requests = 0
+        self.batches = 0
+
+    def _solve(self, pairs, deliver):
+        # runs on an executor thread; deliver(index, result) is thread-safe
+        if self.router is not None:
+            for i, result in self.router.iter_routes(pairs, ordered=False):
+                deliver(i, result)
+            return
+        by_start = {}
+        for i, (start, destination) in enumerate(pairs):
+            by_start.setdefault(start, []).append((i, destination))
+        for start, queries in by_start.items():
+            results = self.graph.routes_from(start, [destination for _, destination in queries])
+            for (i, _), result in zip(queries, results):
+                deliver(i, result)
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batches += 1
+            futures = [future for _, future in batch]
+
+            def deliver(i, result, futures=futures):
+                loop.call_soon_threadsafe(_resolve, futures[i], result)
+
+            pairs = [pair for pair, _ in batch]
+            job = loop.run_in_executor(self._executor, self._solve, pairs, deliver)
+            job.add_done_callback(lambda job, futures=futures: _fail_pending(job, futures))
+
+    def _parse(self, line):
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        return request
+
+    def _pair(self, request):
+        # (start, destination) of a request, checked here so a bad one gets
+        # its own error reply instead of failing the batch it would join
+        pair = []
+        for key in ('start', 'destination'):
+            pos = request.get(key)
+            # bool is an int subclass, but [true, 0] is not a coordinate
+            if not (isinstance(pos, list) and len(pos) == 2
+                    and all(isinstance(x, int) and not isinstance(x, bool) for x in pos)):
+                raise ValueError(f"{key} must be [row, col]")
+            r, c = pos
+            if not (0 <= r < self.rows and 0 <= c < self.cols):
+                raise ValueError(f"{key} {pos} is outside the {self.rows}x{self.cols} map")
+            pair.append((r, c))
+        return tuple(pair)
+
+    async def route(self, start, destination):
+        # one route through the batching queue, for callers inside the loop
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        await self._queue.put(((start, destination), future))
+        return await future
+
+    def _ensure_started(self):
+        if self._batcher is None:
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.get_running_loop().create_task(self._run_batches())
+
+    async def handle_client(self, reader, writer):
+        pending = set()
+
+        async def respond(request_id, pair):
+            try:
+                cost, path = await self.route(*pair)
+                reply = {'id': request_id, 'cost': None if cost == float('inf') else cost,
+                         'path': [list(pos) for pos in path]}
+            except Exception as e:
+                reply = {'id': request_id, 'error': str(e)}
+            writer.write((json.dumps(reply) + '\n').encode())
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                request_id = None
+                try:
+                    request = self._parse(line)
+                    request_id = request.get('id')
+                    pair = self._pair(request)
+                except ValueError as e:
+                    writer.write((json.dumps({'id': request_id, 'error': str(e)}) + '\n').encode())
+                    continue
+                task = asyncio.ensure_future(respond(request_id, pair))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765, path=None):
+        # asyncio server on a Unix socket if path is given, otherwise TCP
+        self._ensure_started()
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_client, path=path)
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    def close(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            self._batcher = None
+        self._executor.shutdown(wait=True)
+        if self.router is not None:
+            self.router.close()
+
+
+def _resolve(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _fail_pending(job, futures):
+    # a batch that crashed must not leave its clients waiting forever
+    if job.cancelled() or job.exception() is None:
+        return
+    for future in futures:
+        if not future.done():
+            future.set_exception(job.exception())
+
+
+async def request_routes(pairs, host='127.0.0.1', port=8765, path=None):
+    # client helper: sends every (start, destination) pair on one connection
+    # and returns the (cost, path) results in input order
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    for i, (start, destination) in enumerate(pairs):
+        writer.write((json.dumps({'id': i, 'start': list(start), 'destination': list(destination)}) + '\n').encode())
+    await writer.drain()
+    writer.write_eof()
+
+    results = [None] * len(pairs)
+    try:
+        async for line in reader:
+            reply = json.loads(line)
+            if 'error' in reply:
+                raise ValueError(reply['error'])
+            cost = float('inf') if reply['cost'] is None else reply['cost']
+            results[reply['id']] = (cost, [tuple(pos) for pos in reply['path']])
+    finally:
+        writer.close()
+    return results
+
+
+async def _serve(args):
+    t = time.perf_counter()
+    grid = load_map(args.map)
+    service = RouteService(grid, args.processes, args.window, args.max_batch)
+    server = await service.start(args.host, args.port, args.socket)
+    where = args.socket or f"{args.host}:{args.port}"
+    print(f"{grid.rows}x{grid.cols} map ready in {time.perf_counter() - t:.2f}s, listening on {where}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve routes on one warehouse map over NDJSON")
+    parser.add_argument('map', help="map file written by map_format.save_map")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes, 0 to route in-process")
+    parser.add_argument('--window', type=float, default=0.005, help="batching window in seconds")
+    parser.add_argument('--max-batch', type=int, default=256)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
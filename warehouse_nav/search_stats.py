@@ -0,0 +1,57 @@
+import time
+
+
+class SearchStats:
+    # Counters for one query, filled in by DijkstraPathfinder when
+    # collect_stats is on or an on_expand callback is set. neighbor_time and
+    # cost_time are only measured with collect_stats, since timing every call
+    # slows the search down noticeably; they are meant for comparing the two,
+    # not as absolute numbers.
+    def __init__(self, engine, on_expand=None):
+        self.engine = engine
+        self.on_expand = on_expand
+        self.nodes_expanded = 0
+        self.edges_relaxed = 0
+        self.heap_pushes = 0
+        self.frontier_peak = 0
+        self.neighbor_time = 0.0
+        self.cost_time = 0.0
+        self.total_time = 0.0
+
+    def expanded(self, pos, cost, frontier_size):
+        # called once per expanded cell, after its neighbors were pushed
+        if frontier_size > self.frontier_peak:
+            self.frontier_peak = frontier_size
+        if self.on_expand is not None:
+            self.on_expand(pos, cost)
+
+    def timed_neighbors(self, get_neighbors):
+        def timed(r, c):
+            t = time.perf_counter()
+            neighbors = list(get_neighbors(r, c))
+            self.neighbor_time += time.perf_counter() - t
+            return neighbors
+        return timed
+
+    def timed_cost(self, get_cost):
+        def timed(current, neighbor, direction):
+            t = time.perf_counter()
+            cost = get_cost(current, neighbor, direction)
+            self.cost_time += time.perf_counter() - t
+            return cost
+        return timed
+
+    def as_dict(self):
+        return {
+            'engine': self.engine,
+            'nodes_expanded': self.nodes_expanded,
+            'edges_relaxed': self.edges_relaxed,
+            'heap_pushes': self.heap_pushes,
+            'frontier_peak': self.frontier_peak,
+            'neighbor_time': self.neighbor_time,
+            'cost_time': self.cost_time,
+            'total_time': self.total_time,
+        }
+
+    def __repr__(self):
+        return f"SearchStats({self.as_dict()})"
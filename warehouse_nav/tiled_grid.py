@@ -0,0 +1,292 @@
+import numpy as np
+
+from .warehouse_grid import CELL_TYPES, DEFAULT_COST_MAP, WarehouseGrid
+
+
+class _FlatLookup:
+    # indexable by r * cols + c like the flat memoryviews DijkstraPathfinder
+    # reads a WarehouseGrid through, but answered by the tiled store
+    def __init__(self, lookup, cols):
+        self.lookup = lookup
+        self.cols = cols
+
+    def __getitem__(self, index):
+        r, c = divmod(index, self.cols)
+        return self.lookup(r, c)
+
+
+class TiledGrid:
+    # Warehouse layout for very large sites, kept as tile x tile blocks of
+    # uint8 codes. A block whose cells all hold one code is stored as just
+    # that code, and blocks never written hold `fill`, so a mostly empty site
+    # costs memory for its detailed blocks only. A block gets a real array the
+    # first time one of its cells is set to something else.
+    #
+    # Rectangular overlays (priority lanes, slow zones, closed aisles) sit on
+    # top of the cells and can be added and removed without touching them.
+    # The newest overlay with a cost covering a cell sets its cost; overlays
+    # only ever close cells, never open walls. cost(r, c) and is_open(r, c)
+    # give the effective values, to_grid() a dense WarehouseGrid of any window.
+    # Same cell types, cost_map and revision counter as WarehouseGrid.
+    def __init__(self, rows, cols, fill='.', tile=256, cell_types=None, cost_map=None):
+        if rows < 1 or cols < 1:
+            raise ValueError("Tiled grid must have at least one row and column")
+        if tile < 1:
+            raise ValueError("Tile size must be positive")
+        self.rows = rows
+        self.cols = cols
+        self.tile = tile
+        self.cell_types = list(CELL_TYPES if cell_types is None else cell_types)
+        self.cost_map = dict(DEFAULT_COST_MAP if cost_map is None else cost_map)
+        self._build_tables()
+        self.fill = self.code_of(fill)
+        # (tile row, tile col) -> uniform code, or a 2D memoryview of the codes
+        self._tiles = {}
+        # overlay id -> (top, left, bottom, right, cost or None, False or None)
+        self._overlays = {}
+        # (tile row, tile col) -> ids of the overlays touching it, oldest first
+        self._tile_overlays = {}
+        self._next_overlay = 0
+        self.revision = 0
+
+    @classmethod
+    def from_grid(cls, grid, tile=256):
+        # tiles a WarehouseGrid (or list of lists of characters), collapsing
+        # every uniform block; the most common code becomes the fill
+        if not isinstance(grid, WarehouseGrid):
+            grid = WarehouseGrid.from_chars(grid)
+        fill = int(np.argmax(np.bincount(grid.codes.reshape(-1), minlength=len(grid.cell_types))))
+        tiled = cls(grid.rows, grid.cols, grid.cell_types[fill], tile, grid.cell_types, grid.cost_map)
+        for key in tiled._keys(0, 0, grid.rows, grid.cols):
+            top, left, bottom, right = tiled._bounds(key)
+            block = grid.codes[top:bottom, left:right]
+            first = int(block[0, 0])
+            if not (block == first).all():
+                tiled._tiles[key] = memoryview(np.array(block, dtype=np.uint8))
+            elif first != fill:
+                tiled._tiles[key] = first
+        return tiled
+
+    # same cell type bookkeeping as WarehouseGrid
+    code_of = WarehouseGrid.code_of
+
+    def _build_tables(self):
+        WarehouseGrid._build_tables(self)
+        # plain lists are faster than the arrays for one cell at a time
+        self._cost_list = self.cost_table.tolist()
+        self._open_list = self.passable_table.tolist()
+
+    @property
+    def shape(self):
+        return self.rows, self.cols
+
+    def _bounds(self, key):
+        tr, tc = key
+        top, left = tr * self.tile, tc * self.tile
+        return top, left, min(top + self.tile, self.rows), min(left + self.tile, self.cols)
+
+    def _keys(self, top, left, bottom, right):
+        # every tile touching the window [top, bottom) x [left, right)
+        t = self.tile
+        return [(tr, tc) for tr in range(top // t, (bottom - 1) // t + 1)
+                for tc in range(left // t, (right - 1) // t + 1)]
+
+    def _check_window(self, top, left, bottom, right):
+        if not (0 <= top < bottom <= self.rows and 0 <= left < right <= self.cols):
+            raise ValueError(f"Window {(top, left, bottom, right)} is not inside the {self.rows}x{self.cols} grid")
+
+    def code(self, r, c):
+        # code of the cell itself, overlays not applied
+        t = self.tile
+        block = self._tiles.get((r // t, c // t), self.fill)
+        return block if isinstance(block, int) else block[r % t, c % t]
+
+    def cell(self, r, c):
+        return self.cell_types[self.code(r, c)]
+
+    def cost(self, r, c):
+        # cost of entering the cell, overlays applied
+        t = self.tile
+        key = (r // t, c // t)
+        overlays = self._tile_overlays.get(key)
+        if overlays:
+            for overlay in reversed(overlays):
+                top, left, bottom, right, cost, _ = self._overlays[overlay]
+                if cost is not None and top <= r < bottom and left <= c < right:
+                    return cost
+        block = self._tiles.get(key, self.fill)
+        return self._cost_list[block if block.__class__ is int else block[r % t, c % t]]
+
+    def is_open(self, r, c):
+        t = self.tile
+        key = (r // t, c // t)
+        overlays = self._tile_overlays.get(key)
+        if overlays:
+            for overlay in reversed(overlays):
+                top, left, bottom, right, _, passable = self._overlays[overlay]
+                if passable is not None and top <= r < bottom and left <= c < right:
+                    return passable
+        block = self._tiles.get(key, self.fill)
+        return self._open_list[block if block.__class__ is int else block[r % t, c % t]]
+
+    def flat_costs(self):
+        return _FlatLookup(self.cost, self.cols)
+
+    def flat_passable(self):
+        return _FlatLookup(self.is_open, self.cols)
+
+    def _materialize(self, key):
+        block = self._tiles.get(key, self.fill)
+        if isinstance(block, int):
+            top, left, bottom, right = self._bounds(key)
+            block = memoryview(np.full((bottom - top, right - left), block, dtype=np.uint8))
+            self._tiles[key] = block
+        return block
+
+    def set_cell(self, r, c, cell):
+        if not (0 <= r < self.rows and 0 <= c < self.cols):
+            raise ValueError(f"Cell {(r, c)} is outside the grid")
+        code = self.code_of(cell)
+        if self.code(r, c) == code:
+            return
+        t = self.tile
+        self._materialize((r // t, c // t))[r % t, c % t] = code
+        self.revision += 1
+
+    def fill_rect(self, top, left, bottom, right, cell):
+        # sets every cell of [top, bottom) x [left, right); blocks it covers
+        # completely collapse to one code instead of being written
+        self._check_window(top, left, bottom, right)
+        code = self.code_of(cell)
+        for key in self._keys(top, left, bottom, right):
+            t_top, t_left, t_bottom, t_right = self._bounds(key)
+            if top <= t_top and left <= t_left and t_bottom <= bottom and t_right <= right:
+                if code == self.fill:
+                    self._tiles.pop(key, None)
+                else:
+                    self._tiles[key] = code
+            else:
+                block = np.asarray(self._materialize(key))
+                block[max(top, t_top) - t_top:min(bottom, t_bottom) - t_top,
+                      max(left, t_left) - t_left:min(right, t_right) - t_left] = code
+        self.revision += 1
+
+    def compact(self):
+        # collapses blocks that became uniform through edits; returns how many
+        collapsed = 0
+        for key, block in list(self._tiles.items()):
+            if isinstance(block, int):
+                continue
+            codes = np.asarray(block)
+            first = int(codes[0, 0])
+            if (codes == first).all():
+                if first == self.fill:
+                    del self._tiles[key]
+                else:
+                    self._tiles[key] = first
+                collapsed += 1
+        return collapsed
+
+    def add_overlay(self, top, left, bottom, right, cell=None, cost=None):
+        # overlays [top, bottom) x [left, right) and returns its id for
+        # remove_overlay(). cell gives the area that cell type's cost ('P'
+        # priority lane) and closes it if the type is a wall ('X' closed
+        # aisle); an open type never opens what it covers, so a lane across
+        # shelving keeps the shelves. cost alone only changes the cost of
+        # entering (a slow zone).
+        self._check_window(top, left, bottom, right)
+        if cell is None and cost is None:
+            raise ValueError("Overlay needs a cell type or a cost")
+        passable = None
+        if cell is not None:
+            code = self.code_of(cell)
+            passable = None if self._open_list[code] else False
+            if cost is None:
+                cost = self._cost_list[code]
+        if cost is not None and cost < 0:
+            raise ValueError("Overlay cost must not be negative")
+        overlay = self._next_overlay
+        self._next_overlay += 1
+        self._overlays[overlay] = (top, left, bottom, right, None if cost is None else float(cost), passable)
+        for key in self._keys(top, left, bottom, right):
+            self._tile_overlays.setdefault(key, []).append(overlay)
+        self.revision += 1
+        return overlay
+
+    def remove_overlay(self, overlay):
+        if overlay not in self._overlays:
+            raise ValueError(f"No overlay {overlay!r}")
+        top, left, bottom, right, _, _ = self._overlays.pop(overlay)
+        for key in self._keys(top, left, bottom, right):
+            ids = self._tile_overlays[key]
+            ids.remove(overlay)
+            if not ids:
+                del self._tile_overlays[key]
+        self.revision += 1
+
+    def overlays(self):
+        return dict(self._overlays)
+
+    def _window_arrays(self, top, left, bottom, right):
+        # codes, effective costs and passability of a window
+        codes = np.full((bottom - top, right - left), self.fill, dtype=np.uint8)
+        for key in self._keys(top, left, bottom, right):
+            if key not in self._tiles:
+                continue
+            t_top, t_left, t_bottom, t_right = self._bounds(key)
+            r0, r1 = max(top, t_top), min(bottom, t_bottom)
+            c0, c1 = max(left, t_left), min(right, t_right)
+            block = self._tiles[key]
+            if not isinstance(block, int):
+                block = np.asarray(block)[r0 - t_top:r1 - t_top, c0 - t_left:c1 - t_left]
+            codes[r0 - top:r1 - top, c0 - left:c1 - left] = block
+        costs = self.cost_table[codes]
+        passable = self.passable_table[codes]
+        for o_top, o_left, o_bottom, o_right, cost, open_ in self._overlays.values():
+            r0, r1 = max(top, o_top), min(bottom, o_bottom)
+            c0, c1 = max(left, o_left), min(right, o_right)
+            if r0 >= r1 or c0 >= c1:
+                continue
+            area = (slice(r0 - top, r1 - top), slice(c0 - left, c1 - left))
+            if cost is not None:
+                costs[area] = cost
+            if open_ is not None:
+                passable[area] = open_
+        return codes, costs, passable
+
+    def to_grid(self, top=0, left=0, bottom=None, right=None):
+        # dense WarehouseGrid of a window (the whole map by default) with the
+        # overlays baked into its costs and passability
+        bottom = self.rows if bottom is None else bottom
+        right = self.cols if right is None else right
+        self._check_window(top, left, bottom, right)
+        codes, costs, passable = self._window_arrays(top, left, bottom, right)
+        grid = WarehouseGrid(codes, self.cell_types, self.cost_map)
+        grid._costs = costs
+        grid._passable = passable
+        return grid
+
+    def count_free_cells(self):
+        # open cells that cost nothing to enter (what A*'s heuristic needs to
+        # stay admissible), counted block by block
+        free = np.array([cost <= 0 and open_ for cost, open_ in zip(self._cost_list, self._open_list)])
+        detailed = set(self._tiles) | set(self._tile_overlays)
+        count = 0
+        fill_cells = self.rows * self.cols
+        for key in detailed:
+            top, left, bottom, right = self._bounds(key)
+            fill_cells -= (bottom - top) * (right - left)
+            if key in self._tile_overlays:
+                _, costs, passable = self._window_arrays(top, left, bottom, right)
+                count += int(np.count_nonzero((costs <= 0) & passable))
+            else:
+                block = self._tiles[key]
+                if isinstance(block, int):
+                    count += (bottom - top) * (right - left) if free[block] else 0
+                else:
+                    count += int(np.count_nonzero(free[np.asarray(block)]))
+        return count + (fill_cells if free[self.fill] else 0)
+
+    def nbytes(self):
+        # bytes of cell codes actually stored; uniform blocks are free
+        return sum(block.nbytes for block in self._tiles.values() if not isinstance(block, int))
@@ -0,0 +1,188 @@
+from itertools import combinations
+
+import numpy as np
+
+from .route_cache import RouteCache
+
+INF = float('inf')
+
+
+class TourPlanner:
+    # Plans a pick tour: start somewhere, visit every stop in whatever order is
+    # cheapest, optionally finish at end. The cost between two locations comes
+    # from one distance field per location (a full search from it), so k stops
+    # need k searches, not k^2. Fields live in a RouteCache and the pairwise
+    # costs read from them are kept until the grid changes, so shelves that
+    # come up order after order are only searched once per map revision.
+    # While plan() runs it also holds on to every field it searched, so the
+    # path is stitched without searching again even when the fields do not
+    # fit in the cache.
+    #
+    # Costs are not symmetric (up/left moves are cheaper), so every step below
+    # works on the directed matrix. Up to exact_limit stops the order is
+    # optimal (Held-Karp DP); above that it comes from nearest neighbor
+    # improved with Or-opt and 2-opt moves until neither finds a gain.
+    def __init__(self, grid, exact_limit=10, max_bytes=64 * 1024 * 1024):
+        self.routes = RouteCache(grid, max_bytes)
+        self.grid = self.routes.grid
+        self.exact_limit = exact_limit
+        self.revision = self.grid.revision
+        self._pair_costs = {}
+
+    def set_cell(self, r, c, cell):
+        self.routes.set_cell(r, c, cell)
+
+    def _check_revision(self):
+        if self.grid.revision != self.revision:
+            self._pair_costs.clear()
+            self.revision = self.grid.revision
+
+    def cost(self, a, b, fields=None):
+        # fields, if given, is a dict that keeps every field searched here
+        self._check_revision()
+        key = (a, b)
+        if key not in self._pair_costs:
+            self._pair_costs[key] = self._field(a, fields).cost(b)
+        return self._pair_costs[key]
+
+    def _field(self, source, fields):
+        if fields is None:
+            return self.routes.distance_field(source)
+        if source not in fields:
+            fields[source] = self.routes.distance_field(source)
+        return fields[source]
+
+    def matrix(self, points, fields=None):
+        # matrix[i][j] is the cost of going from points[i] to points[j]
+        for point in points:
+            if not (0 <= point[0] < self.grid.rows and 0 <= point[1] < self.grid.cols):
+                raise ValueError(f"Location {point} is outside the grid")
+        return np.array([[self.cost(a, b, fields) for b in points] for a in points])
+
+    def plan(self, start, stops, end=None):
+        # (cost, order, path): order lists the stops in visiting order and
+        # path the cells of the whole tour; (inf, [], []) if some stop can't
+        # be reached
+        stops = [stop for stop in dict.fromkeys(stops) if stop != start and stop != end]
+        points = [start] + stops + ([end] if end is not None else [])
+        fields = {}
+        matrix = self.matrix(points, fields)
+        if np.isinf(matrix[:, 1:]).any():
+            # no tour ever returns to the start, so only column 0 may be inf
+            return INF, [], []
+        k = len(stops)
+        last = k + 1 if end is not None else None
+
+        if k <= self.exact_limit:
+            sequence = self._held_karp(matrix, k, last)
+        else:
+            sequence = self._improve(matrix, self._nearest_neighbor(matrix, k), last)
+        cost = self._tour_cost(matrix, sequence, last)
+        legs = [0] + sequence + ([last] if last is not None else [])
+        path = [start]
+        for a, b in zip(legs, legs[1:]):
+            _, leg = self._field(points[a], fields).path_to(points[b])
+            path.extend(leg[1:])
+        return cost, [points[i] for i in sequence], path
+
+    @staticmethod
+    def _tour_cost(matrix, sequence, last):
+        legs = [0] + sequence + ([last] if last is not None else [])
+        return float(sum(matrix[a][b] for a, b in zip(legs, legs[1:])))
+
+    @staticmethod
+    def _held_karp(matrix, k, last):
+        # best[mask][j]: cheapest way from the start through the stops in mask
+        # ending at stop j (stops are 1..k, bit j - 1 of mask)
+        if k == 0:
+            return []
+        best = {}
+        for j in range(1, k + 1):
+            best[1 << (j - 1), j] = (matrix[0][j], 0)
+        for size in range(2, k + 1):
+            for subset in combinations(range(1, k + 1), size):
+                mask = 0
+                for j in subset:
+                    mask |= 1 << (j - 1)
+                for j in subset:
+                    prev_mask = mask & ~(1 << (j - 1))
+                    best[mask, j] = min((best[prev_mask, i][0] + matrix[i][j], i)
+                                        for i in subset if i != j)
+
+        full = (1 << k) - 1
+        tail = (lambda j: matrix[j][last]) if last is not None else (lambda j: 0)
+        _, j = min((best[full, j][0] + tail(j), j) for j in range(1, k + 1))
+        sequence = []
+        mask = full
+        while j:
+            sequence.append(j)
+            mask, j = mask & ~(1 << (j - 1)), best[mask, j][1]
+        sequence.reverse()
+        return sequence
+
+    @staticmethod
+    def _nearest_neighbor(matrix, k):
+        sequence = []
+        left = set(range(1, k + 1))
+        current = 0
+        while left:
+            current = min(left, key=lambda j: (matrix[current][j], j))
+            sequence.append(current)
+            left.remove(current)
+        return sequence
+
+    @staticmethod
+    def _improve(matrix, sequence, last):
+        # first-improvement local search; each move is priced from the legs it
+        # changes only. An open tour (no end) has a free edge after the last
+        # stop, written as None.
+        def leg(a, b):
+            return 0.0 if b is None else matrix[a][b]
+
+        tour = [0] + sequence + [last]
+        improved = True
+        while improved:
+            improved = False
+            n = len(tour) - 2  # stops sit at tour[1..n]
+
+            # Or-opt: move a run of 1-3 stops elsewhere, keeping its direction
+            for length in (1, 2, 3):
+                for a in range(1, n - length + 2):
+                    b = a + length - 1
+                    before, first, end, after = tour[a - 1], tour[a], tour[b], tour[b + 1]
+                    removed = leg(before, first) + leg(end, after) - leg(before, after)
+                    rest = tour[:a] + tour[b + 1:]
+                    for i in range(len(rest) - 1):
+                        if i == a - 1:
+                            continue
+                        x, y = rest[i], rest[i + 1]
+                        if leg(x, first) + leg(end, y) - leg(x, y) < removed - 1e-9:
+                            tour = rest[:i + 1] + tour[a:b + 1] + rest[i + 1:]
+                            improved = True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+            if improved:
+                continue
+
+            # 2-opt: reverse tour[a..b]; costs are directed, so the reversed
+            # stretch is re-priced from running sums of both directions
+            forward = [0.0]
+            backward = [0.0]
+            for x, y in zip(tour[:n], tour[1:n + 1]):
+                forward.append(forward[-1] + matrix[x][y])
+                backward.append(backward[-1] + matrix[y][x])
+            for a in range(1, n):
+                for b in range(a + 1, n + 1):
+                    before, after = tour[a - 1], tour[b + 1]
+                    old = leg(before, tour[a]) + forward[b] - forward[a] + leg(tour[b], after)
+                    new = leg(before, tour[b]) + backward[b] - backward[a] + leg(tour[a], after)
+                    if new < old - 1e-9:
+                        tour[a:b + 1] = tour[a:b + 1][::-1]
+                        improved = True
+                        break
+                if improved:
+                    break
+        return tour[1:-1]
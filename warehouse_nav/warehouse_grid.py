@@ -0,0 +1,119 @@
+import numpy as np
+
+# same numbering as cell_types in mapbuildingsim.py
+CELL_TYPES = ['.', 'X', 'P', 'S', 'D']
+WALL = 'X'
+DEFAULT_COST_MAP = {
+    '.': 1,
+    'P': 0.5,
+    'S': 0,
+    'D': 1
+}
+
+
+class WarehouseGrid:
+    # Compact warehouse layout: one uint8 code per cell, the cost of entering
+    # each cell as float32 and a boolean passability mask. cell_types[code]
+    # gives the character a code stands for.
+    def __init__(self, codes, cell_types=None, cost_map=None):
+        self.codes = np.ascontiguousarray(codes, dtype=np.uint8)
+        if self.codes.ndim != 2 or 0 in self.codes.shape:
+            raise ValueError("Warehouse grid must be a non-empty 2D array")
+        self.rows, self.cols = self.codes.shape
+        self.cell_types = list(CELL_TYPES if cell_types is None else cell_types)
+        self.cost_map = dict(DEFAULT_COST_MAP if cost_map is None else cost_map)
+        self._build_tables()
+        # per-cell costs and passability are derived on first use, so wrapping
+        # a large memory-mapped code array stays cheap until something searches
+        self._costs = None
+        self._passable = None
+        # bumped by every set_cell that changes something, so anything built
+        # from the grid can tell when it went stale
+        self.revision = 0
+
+    @classmethod
+    def from_chars(cls, grid, cost_map=None):
+        # adapter from the list-of-lists of single characters used everywhere else
+        rows = len(grid)
+        cols = len(grid[0]) if rows else 0
+        if any(len(row) != cols for row in grid):
+            raise ValueError("All grid rows must have the same length")
+        try:
+            raw = ''.join(''.join(row) for row in grid).encode('latin-1')
+        except (TypeError, UnicodeEncodeError):
+            raise ValueError("Grid cells must be single latin-1 characters") from None
+        if len(raw) != rows * cols:
+            raise ValueError("Grid cells must be single characters")
+
+        flat = np.frombuffer(raw, dtype=np.uint8)
+        cell_types = list(CELL_TYPES)
+        lookup = np.zeros(256, dtype=np.uint8)
+        for byte in np.unique(flat):
+            char = chr(byte)
+            if char not in cell_types:
+                if len(cell_types) == 256:
+                    raise ValueError("Too many distinct cell types")
+                cell_types.append(char)
+            lookup[byte] = cell_types.index(char)
+        return cls(lookup[flat].reshape(rows, cols), cell_types, cost_map)
+
+    def to_chars(self):
+        return np.array(self.cell_types)[self.codes].tolist()
+
+    @property
+    def costs(self):
+        if self._costs is None:
+            self._costs = self.cost_table[self.codes]
+        return self._costs
+
+    @property
+    def passable(self):
+        if self._passable is None:
+            self._passable = self.passable_table[self.codes]
+        return self._passable
+
+    @property
+    def shape(self):
+        return self.rows, self.cols
+
+    def code_of(self, cell):
+        if cell not in self.cell_types:
+            if len(self.cell_types) == 256:
+                raise ValueError("Too many distinct cell types")
+            self.cell_types.append(cell)
+            self._build_tables()
+        return self.cell_types.index(cell)
+
+    def cell(self, r, c):
+        return self.cell_types[self.codes[r, c]]
+
+    # the per-cell reads TiledGrid has too, so code can take either store
+    def cost(self, r, c):
+        return float(self.costs[r, c])
+
+    def is_open(self, r, c):
+        return bool(self.passable[r, c])
+
+    def set_cell(self, r, c, cell):
+        code = self.code_of(cell)
+        if self.codes[r, c] == code:
+            return
+        self.revision += 1
+        self.codes[r, c] = code
+        self.costs[r, c] = self.cost_table[code]
+        self.passable[r, c] = self.passable_table[code]
+
+    def find(self, cell):
+        # (r, c) of every cell of this type in row-major order
+        if cell not in self.cell_types:
+            return []
+        return [tuple(pos) for pos in np.argwhere(self.codes == self.cell_types.index(cell)).tolist()]
+
+    def nbytes(self):
+        return self.codes.nbytes + self.costs.nbytes + self.passable.nbytes
+
+    def _build_tables(self):
+        # unknown cell types cost 1 and everything except walls is passable,
+        # exactly like DijkstraPathfinder.get_cost/get_neighbors on char grids
+        self.cost_table = np.array([self.cost_map.get(cell, 1) for cell in self.cell_types], dtype=np.float32)
+        self.passable_table = np.array([cell != WALL for cell in self.cell_types], dtype=bool)
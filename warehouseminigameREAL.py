@@ -1,95 +1,10 @@
 import random
 import os
-import matplotlib.pyplot as plt
 import numpy as np
 
-class DijkstraPathfinder:
-    def __init__(self, grid):
-        self.grid = grid
-        self.rows = len(grid)
-        self.cols = len(grid[0])
-        self.directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        self.cost_map = {
-            '.': 1,
-            'P': 0.5,
-            'S': 0,
-            'D': 1
-        }
+from warehouse_nav.grid_generator import generate_grid
+from warehouse_nav.pathfinder import DijkstraPathfinder, find_start_end, print_grid_with_path
 
-    def get_cost(self, current, neighbor, direction):
-        r, c = neighbor
-        cell = self.grid[r][c]
-        move_cost = self.cost_map.get(cell, 1)
-        # Reduce cost if moving up or left
-        if direction in [(-1, 0), (0, -1)]:
-            move_cost = 0.5
-        return move_cost
-
-    def get_neighbors(self, r, c):
-        for dr, dc in self.directions:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < self.rows and 0 <= nc < self.cols and self.grid[nr][nc] != 'X':
-                yield (nr, nc), (dr, dc)
-
-    def dijkstra(self, start, destination):
-        unvisited = {
-            (r, c)
-            for r in range(self.rows)
-            for c in range(self.cols)
-            if self.grid[r][c] != 'X'
-        }
-        costs = {pos: float('inf') for pos in unvisited}
-        parents = {}
-        costs[start] = 0
-
-        while unvisited:
-            current = min(unvisited, key=lambda pos: costs[pos])
-            if current == destination:
-                break
-
-            unvisited.remove(current)
-            r, c = current
-
-            for neighbor, direction in self.get_neighbors(r, c):
-                if neighbor not in unvisited:
-                    continue
-                new_cost = costs[current] + self.get_cost(current, neighbor, direction)
-                if new_cost < costs[neighbor]:
-                    costs[neighbor] = new_cost
-                    parents[neighbor] = current
-
-        # reconstruct path
-        path = []
-        cur = destination
-        while cur in parents:
-            path.append(cur)
-            cur = parents[cur]
-        if cur == start:
-            path.append(start)
-            path.reverse()
-            return costs[destination], path
-        else:
-            return float('inf'), []
-
-def find_start_end(grid):
-    start = end = None
-    for r in range(len(grid)):
-        for c in range(len(grid[0])):
-            if grid[r][c] == 'S':
-                start = (r, c)
-            elif grid[r][c] == 'D':
-                end = (r, c)
-    return start, end
-
-def print_grid_with_path(grid, path):
-    grid_with_path = [row.copy() for row in grid]
-    for (r, c) in path:
-        if grid_with_path[r][c] not in ('S', 'D'):
-            grid_with_path[r][c] = '*'
-    print("Grid with Path:")
-    for row in grid_with_path:
-        print(' '.join(row))
-    print()
 
 def generate_game_grid(rows, cols, obstacle_prob=0.2, slow_prob=0.1):
     grid = [['.' for _ in range(cols)] for _ in range(rows)]
@@ -130,24 +45,13 @@ def print_grid(grid, player_pos):
     print("  R = Regenerate grid (if impossible)")
     print("  Q = Quit game\n")
 
-def play_game(rows=10, cols=10, move_limit=30):
-    while True:
-        grid = generate_game_grid(rows, cols)
-        start, dest = find_start_end(grid)
-        pf_check = DijkstraPathfinder(grid)
-        cost_check, path_check = pf_check.dijkstra(start, dest)
-
-        if not path_check:
-            print_grid(grid, (0,0))
-            print("⚠️  No possible path on this grid!")
-            choice = input("Press R to regenerate grid, or Q to quit: ").strip().upper()
-            if choice == 'R':
-                continue
-            else:
-                print("Goodbye!")
-                return
-        else:
-            break
+def play_game(rows=10, cols=10, move_limit=30, seed=None):
+    # generate_grid only hands out grids where D can be reached from S;
+    # seed is an int for a reproducible game or the Generator R passes on
+    rng = np.random.default_rng(seed)
+    grid = generate_grid(rows, cols, 0.2, 0.1, rng).to_chars()
+    start, dest = find_start_end(grid)
+    field = DijkstraPathfinder(grid).distance_field(start)
 
     player = start
     moves = 0
@@ -165,7 +69,7 @@ def play_game(rows=10, cols=10, move_limit=30):
             print("You quit the game. Goodbye!")
             return
         if move == 'R':
-            return play_game(rows, cols, move_limit)  # restart
+            return play_game(rows, cols, move_limit, rng)  # restart
         dirs = {'W': (-1, 0), 'S': (1, 0), 'A': (0, -1), 'D': (0, 1)}
         if move not in dirs:
             continue
@@ -189,9 +93,7 @@ def play_game(rows=10, cols=10, move_limit=30):
         print("😢 Move limit reached! You failed to escape.")
 
     # show optimal path
-    start, dest = find_start_end(grid)
-    pf = DijkstraPathfinder(grid)
-    cost, path = pf.dijkstra(start, dest)
+    cost, path = field.path_to(dest)
     if path:
         print(f"\nOptimal path cost: {cost:.2f}, length: {len(path)}")
         print_grid_with_path(grid, path)
@@ -199,5 +101,4 @@ def play_game(rows=10, cols=10, move_limit=30):
         print("\nNo path exists from S to D in this grid.")
 
 if __name__ == "__main__":
-    random.seed()  # or set to an integer for reproducibility
-    play_game()
+    play_game()  # or play_game(seed=...) for reproducibility